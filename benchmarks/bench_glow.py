@@ -0,0 +1,85 @@
+"""
+Glow text benchmark: legacy 441-pass renderer vs the mask based renderer.
+
+Run from the repo root:
+    python benchmarks/bench_glow.py
+"""
+import os
+import sys
+import time
+from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageChops, ImageStat
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from modules.glow_text import draw_soft_glow_lines  # noqa: E402
+
+FONT_PATH = "Montserrat-ExtraBold.ttf"
+SIZE = (1080, 1920)
+LINES = [
+    ((95, 700), "nobody talks about"),
+    ((120, 800), "how lonely it gets"),
+    ((180, 900), "after graduation"),
+]
+# Mean per-channel difference (0-255) we accept against the legacy look
+MEAN_TOLERANCE = 1.0
+
+
+def legacy_draw_soft_glow_text(base_img, position, text, font, fill="white", glow_color="#FF4EDB", glow_radius=10, blur_radius=8):
+    x, y = position
+    glow_layer = Image.new("RGBA", base_img.size, (0, 0, 0, 0))
+    glow_draw = ImageDraw.Draw(glow_layer)
+    for dx in range(-glow_radius, glow_radius + 1):
+        for dy in range(-glow_radius, glow_radius + 1):
+            glow_draw.text((x + dx, y + dy), text, font=font, fill=glow_color)
+    blurred_glow = glow_layer.filter(ImageFilter.GaussianBlur(blur_radius))
+    base_img = Image.alpha_composite(base_img, blurred_glow)
+    draw = ImageDraw.Draw(base_img)
+    draw.text((x, y), text, font=font, fill=fill)
+    return base_img
+
+
+def background():
+    img = Image.linear_gradient("L").resize(SIZE)
+    return Image.merge("RGBA", (img, img.rotate(180), img, Image.new("L", SIZE, 255)))
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    font = ImageFont.truetype(FONT_PATH, 80)
+    bg = background()
+
+    def legacy():
+        img = bg.copy()
+        for pos, text in LINES:
+            img = legacy_draw_soft_glow_text(img, pos, text, font)
+        return img
+
+    def fast():
+        return draw_soft_glow_lines(bg.copy(), LINES, font)
+
+    legacy_s, legacy_img = timed(legacy, 2)
+    fast_s, fast_img = timed(fast, 5)
+
+    diff = ImageChops.difference(legacy_img.convert("RGB"), fast_img.convert("RGB"))
+    mean_diff = sum(ImageStat.Stat(diff).mean) / 3
+    max_diff = max(hi for _, hi in diff.getextrema())
+
+    print(f"legacy: {legacy_s * 1000:8.1f} ms/slide ({len(LINES)} lines)")
+    print(f"fast:   {fast_s * 1000:8.1f} ms/slide ({legacy_s / fast_s:.1f}x)")
+    print(f"mean abs diff: {mean_diff:.3f}  max abs diff: {max_diff}")
+    if mean_diff > MEAN_TOLERANCE:
+        print(f"❌ mean difference above tolerance {MEAN_TOLERANCE}")
+        sys.exit(1)
+    print("✅ within tolerance")
+
+
+if __name__ == "__main__":
+    main()
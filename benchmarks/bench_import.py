@@ -0,0 +1,57 @@
+"""
+Import-time benchmark for the render path.
+
+Measures a cold `import modules.image_handler` in a fresh interpreter and
+checks that ultralytics/torch stay unloaded until phone detection is used.
+
+Run from the repo root:
+    python benchmarks/bench_import.py
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+RUNS = 3
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(int("ultralytics" in sys.modules), int("torch" in sys.modules))
+"""
+
+
+def cold_import(module):
+    best = float("inf")
+    loaded = None
+    for _ in range(RUNS):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.split()
+        best = min(best, float(out[0]))
+        loaded = out[1:]
+    return best, loaded
+
+
+def main():
+    handler_s, (ultralytics_loaded, torch_loaded) = cold_import("modules.image_handler")
+    print(f"import modules.image_handler: {handler_s * 1000:8.1f} ms "
+          f"(ultralytics loaded: {bool(int(ultralytics_loaded))}, torch loaded: {bool(int(torch_loaded))})")
+
+    try:
+        detector_s, _ = cold_import("ultralytics")
+        print(f"import ultralytics:           {detector_s * 1000:8.1f} ms (paid only when phone detection runs)")
+    except subprocess.CalledProcessError:
+        print("ultralytics not installed, skipping detector import timing")
+
+    if int(ultralytics_loaded) or int(torch_loaded):
+        print("❌ image_handler imports the detector eagerly")
+        sys.exit(1)
+    print("✅ detector import is lazy")
+
+
+if __name__ == "__main__":
+    main()
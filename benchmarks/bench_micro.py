@@ -0,0 +1,93 @@
+"""
+Microbenchmarks for the render path: process_carousel, draw_soft_glow_text, fit_text and
+rasterizing a compiled render plan.
+
+Uses the synthetic backgrounds from benchmarks/fakes.py and reports the best
+of several runs in milliseconds.
+
+Run from the repo root:
+    python benchmarks/bench_micro.py
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from PIL import Image
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fakes import synthetic_background  # noqa: E402
+from modules.background_cache import get_background_cache  # noqa: E402
+from modules.font_cache import get_font  # noqa: E402
+from modules.image_handler import process_carousel, draw_soft_glow_text, get_tiktok_safe_area  # noqa: E402
+from modules.render_plan import compile_plan, rasterize, get_sprite_cache, clear_plan_cache  # noqa: E402
+from modules.text_layout import fit_text  # noqa: E402
+
+FONT_PATH = os.path.join(ROOT, "Montserrat-ExtraBold.ttf")
+CONFIG = {"output_width": 1080, "output_height": 1920, "font_size": 80}
+TEXTS = [
+    "nobody talks about how lonely it gets after graduation",
+    "your friends move away and the group chat goes quiet",
+    "but honestly that is where the growth starts",
+    "you finally learn who you are without anyone watching and that is fine",
+]
+
+
+def best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(repeat=5):
+    workdir = tempfile.mkdtemp(prefix="carousel_micro_")
+    try:
+        backgrounds = [synthetic_background(k) for k in range(len(TEXTS))]
+        font = get_font(FONT_PATH, 80)
+        base = Image.new("RGBA", (1080, 1920), (30, 30, 60, 255))
+        plan = compile_plan(TEXTS[0], FONT_PATH, 80, get_tiktok_safe_area(1080, 1920)).placed(800)
+
+        def carousel(cold):
+            if cold:
+                get_background_cache(CONFIG).clear()
+                get_sprite_cache(CONFIG).clear()
+                clear_plan_cache()
+            process_carousel("auto", backgrounds, FONT_PATH, CONFIG, ["#FFFFFF"], TEXTS,
+                             output_dir=tempfile.mkdtemp(dir=workdir))
+
+        results = {
+            "process_carousel_cold_ms": best_ms(lambda: carousel(True), repeat),
+            "process_carousel_warm_ms": best_ms(lambda: carousel(False), repeat),
+            "draw_soft_glow_text_ms": best_ms(
+                lambda: draw_soft_glow_text(base.copy(), (120, 800), "how lonely it gets", font, fill="white"), repeat * 2
+            ),
+            # Sprite cache hit: compositing only
+            "rasterize_plan_ms": best_ms(lambda: rasterize(plan, base), repeat * 2),
+            "fit_text_ms": best_ms(
+                lambda: [fit_text(text, FONT_PATH, 80, 800, 1300) for text in TEXTS], repeat * 4
+            ) / len(TEXTS),
+        }
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    # process_carousel prints a line per slide; keep the report readable
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        results = run()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
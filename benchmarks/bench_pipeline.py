@@ -0,0 +1,145 @@
+"""
+End-to-end benchmark: the full main() flow against in-process fakes.
+
+Drive, Sheets, gspread and OpenAI are replaced by benchmarks/fakes.py, the
+backgrounds are a synthetic JPEG corpus, and the run happens in a scratch
+working directory so caches, the run journal and temp files start cold and
+the repo's own cache/ is untouched.
+
+Run from the repo root:
+    python benchmarks/bench_pipeline.py --rows 6 --latency 0.05 --error-rate 0.02
+"""
+import argparse
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import yaml
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fakes import FakeDrive, FakeSheets, FakeGspread, FakeOpenAI, Latency, install_fakes  # noqa: E402
+
+FONT_PATH = os.path.join(ROOT, "Montserrat-ExtraBold.ttf")
+SLIDE_TEXTS = [
+    "nobody talks about how lonely it gets after graduation",
+    "your friends move away and the group chat goes quiet",
+    "but honestly that is where the growth starts",
+    "you finally learn who you are without anyone watching",
+]
+
+
+def sheet_ranges(rows, temperature=0.8):
+    return {
+        "Sheet1": [["Slide 1", "Slide 2", "Slide 3", "Slide 4"]] + [list(SLIDE_TEXTS) for _ in range(rows)],
+        "Prompts!A2": [["Rewrite this hook for TikTok: {original}"]],
+        "Prompts!C2": [["Rewrite this slide for TikTok: {original}"]],
+        "Prompts!E2": [["Write a caption for: {slides}"]],
+        "Prompts!G2": [[str(temperature)]],
+    }
+
+
+def run(rows=4, variations=1, latency=0.0, transfer_latency=None, llm_latency=None, error_rate=0.0,
+        images_per_folder=6, render_workers=1, llm_mode="interactive", preview=False, keep_dir=False):
+    """Run main() once in a scratch directory and return a dict of results."""
+    workdir = tempfile.mkdtemp(prefix="carousel_bench_")
+    cwd = os.getcwd()
+    with open(os.path.join(ROOT, "config.yaml")) as f:
+        config = yaml.safe_load(f)
+    config.update({
+        "render_workers": render_workers,
+        "phone_detection": False,
+        "llm_mode": llm_mode,
+        "llm_batch_poll_seconds": 0,
+        "metrics": {"export": "", "profile_stage": "", "profile_mode": "cprofile"},
+    })
+    os.chdir(workdir)
+    try:
+        with open("config.yaml", "w") as f:
+            yaml.safe_dump(config, f)
+        os.makedirs("temp", exist_ok=True)
+
+        main = importlib.import_module("main")
+        main.NUM_VARIATIONS = variations
+
+        # Errors are injected into transfers and LLM calls; listing and folder creation stay reliable
+        drive = FakeDrive(
+            latency=Latency(latency, latency / 2, 0.0, seed=1),
+            transfer_latency=Latency(transfer_latency if transfer_latency is not None else latency * 2, latency, error_rate, seed=2),
+        )
+        drive.add_corpus(main.FOLDER_IDS, images_per_folder=images_per_folder)
+        with open(FONT_PATH, "rb") as f:
+            drive.add_file(main.FONTS_FOLDER_ID, os.path.basename(FONT_PATH), f.read(), "font/ttf")
+        sheets = FakeSheets(sheet_ranges(rows), latency=Latency(latency, 0, 0.0, seed=3))
+        gspread_client = FakeGspread(latency=Latency(latency, 0, 0.0, seed=4))
+        openai_client = FakeOpenAI(
+            latency=Latency(llm_latency if llm_latency is not None else latency * 10, latency, error_rate, seed=5)
+        )
+        install_fakes(drive, sheets, gspread_client, openai_client)
+
+        start = time.perf_counter()
+        try:
+            main.main(preview=preview)
+        finally:
+            main.OUTPUT_WRITER.flush()
+            main.RENDERER.shutdown()
+            main.UPLOADER.shutdown()
+        elapsed = time.perf_counter() - start
+
+        written = gspread_client.worksheet("Carousel Outputs").rows[1:]
+        if preview:
+            # Contact sheets instead of uploads and sheet rows
+            written = [None] * main.METRICS.counters.get("previews", 0)
+        return {
+            "elapsed_s": elapsed,
+            "carousels": len(written),
+            "carousels_per_min": len(written) / elapsed * 60 if elapsed else 0.0,
+            "uploaded_mb": drive.uploaded_bytes / 1024 ** 2,
+            "fake_errors": {
+                "drive": drive.transfer_latency.errors,
+                "openai": openai_client.latency.errors,
+            },
+            "stages": main.METRICS.stage_stats(),
+        }
+    finally:
+        os.chdir(cwd)
+        if not keep_dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"Scratch directory kept at {workdir}")
+
+
+def add_arguments(parser):
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--variations", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per Drive/Sheets call")
+    parser.add_argument("--transfer-latency", type=float, default=None, help="seconds per download/upload (default 2x --latency)")
+    parser.add_argument("--llm-latency", type=float, default=None, help="seconds per OpenAI call (default 10x --latency)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of transfers and OpenAI calls that fail")
+    parser.add_argument("--images-per-folder", type=int, default=6)
+    parser.add_argument("--render-workers", type=int, default=1)
+    parser.add_argument("--llm-mode", choices=("interactive", "batch"), default="interactive")
+    parser.add_argument("--preview", action="store_true", help="run main.py's preview mode instead of a full run")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--keep-dir", action="store_true", help="keep the scratch working directory")
+    args = parser.parse_args()
+    result = run(
+        rows=args.rows, variations=args.variations, latency=args.latency,
+        transfer_latency=args.transfer_latency, llm_latency=args.llm_latency,
+        error_rate=args.error_rate, images_per_folder=args.images_per_folder,
+        render_workers=args.render_workers, llm_mode=args.llm_mode, preview=args.preview, keep_dir=args.keep_dir,
+    )
+    print(json.dumps({k: v for k, v in result.items() if k != "stages"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Text fitting benchmark: legacy shrink loop vs cached fonts + binary search.
+
+Checks that both produce the same font size and line breaks, then reports
+fitting time per slide.
+
+Run from the repo root:
+    python benchmarks/bench_text_fit.py
+"""
+import os
+import random
+import sys
+import time
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from modules.font_cache import clear_font_cache  # noqa: E402
+from modules.text_layout import fit_text  # noqa: E402
+
+FONT_PATH = "Montserrat-ExtraBold.ttf"
+WORDS = (
+    "nobody talks about how lonely it gets after graduation when your friends "
+    "move away and the group chat goes quiet but honestly that is where growth "
+    "starts because you finally learn who you are without anyone watching "
+    "supercalifragilisticexpialidocious WWWWWWWWWWWWW"
+).split()
+
+
+def get_font_size(char_count, base_chars=80, base_size=80, min_size=60):
+    ratio = base_chars / char_count if char_count > base_chars else 1
+    return max(int(base_size * ratio), min_size)
+
+
+def legacy_fit(text, font_path, font_size, max_width, max_height):
+    draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    line_spacing = 10
+    min_font_size = 60
+    while True:
+        font = ImageFont.truetype(font_path, font_size)
+        lines = []
+        current_line = ""
+        for word in text.split():
+            test_line = current_line + (" " if current_line else "") + word
+            bbox = draw.textbbox((0, 0), test_line, font=font)
+            if bbox[2] - bbox[0] <= max_width:
+                current_line = test_line
+            else:
+                lines.append(current_line)
+                current_line = word
+        if current_line:
+            lines.append(current_line)
+        line_height = font.getbbox("Ay")[3] - font.getbbox("Ay")[1]
+        total_height = len(lines) * (line_height + line_spacing)
+        if total_height <= max_height:
+            break
+        if font_size <= min_font_size:
+            font_size = min_font_size
+            break
+        font_size -= 2
+    return font_size, lines, total_height
+
+
+def make_cases(count, seed=7):
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 70)))
+        # Normal safe box plus narrow/short boxes that force the shrink path
+        max_width, max_height = rng.choice([(800, 1300), (800, 1300), (420, 900), (300, 500)])
+        cases.append((text, get_font_size(len(text)), max_width, max_height))
+    return cases
+
+
+def main():
+    cases = make_cases(300)
+
+    start = time.perf_counter()
+    expected = [legacy_fit(text, FONT_PATH, size, w, h) for text, size, w, h in cases]
+    legacy_s = time.perf_counter() - start
+
+    clear_font_cache()
+    start = time.perf_counter()
+    actual = [fit_text(text, FONT_PATH, size, w, h) for text, size, w, h in cases]
+    fast_s = time.perf_counter() - start
+
+    mismatches = 0
+    for (size, lines, total), result in zip(expected, actual):
+        if (size, lines, total) != (result[0], result[2], result[4]):
+            mismatches += 1
+
+    print(f"legacy: {legacy_s / len(cases) * 1000:6.2f} ms/slide")
+    print(f"fast:   {fast_s / len(cases) * 1000:6.2f} ms/slide ({legacy_s / fast_s:.1f}x)")
+    if mismatches:
+        print(f"❌ {mismatches}/{len(cases)} slides fitted differently")
+        sys.exit(1)
+    print(f"✅ identical size and line breaks on {len(cases)} slides")
+
+
+if __name__ == "__main__":
+    main()
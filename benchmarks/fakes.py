@@ -0,0 +1,378 @@
+"""
+In-process fakes of Drive, Sheets, gspread and OpenAI for offline benchmark runs.
+
+Each fake answers the calls this repo makes, in the shapes the real clients
+return, after a configurable latency. A configurable fraction of calls fail
+with a 503 (or an OpenAI error). Install them with install_fakes() before
+main() runs; nothing leaves the process.
+"""
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from PIL import Image, ImageDraw
+
+from googleapiclient.errors import HttpError
+from modules import google_clients
+from modules.llm import set_openai_client
+
+
+class Latency:
+    """Sleeps `mean` seconds (+/- jitter) per call and fails `error_rate` of calls."""
+
+    def __init__(self, mean=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.mean = mean
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def wait(self):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.mean + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        return fail
+
+
+class FakeResponse(dict):
+    """httplib2.Response lookalike: a header dict with a status."""
+
+    def __init__(self, status, headers=None):
+        super().__init__(headers or {})
+        self.status = status
+        self.reason = "OK" if status < 400 else "Service Unavailable"
+
+
+def _http_error():
+    return HttpError(FakeResponse(503), b'{"error": {"message": "fake backend unavailable"}}')
+
+
+class FakeRequest:
+    """HttpRequest lookalike whose execute() returns a prepared body."""
+
+    def __init__(self, latency, fn):
+        self._latency = latency
+        self._fn = fn
+
+    def execute(self, num_retries=0):
+        if self._latency.wait():
+            raise _http_error()
+        return self._fn()
+
+    def next_chunk(self, num_retries=0):
+        return None, self.execute()
+
+
+class _FakeHttp:
+    def __init__(self, latency, data):
+        self._latency = latency
+        self._data = data
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        if self._latency.wait():
+            return FakeResponse(503), b""
+        return FakeResponse(200, {"content-length": str(len(self._data))}), self._data
+
+
+class FakeMediaRequest:
+    """What files().get_media() returns: enough of HttpRequest for MediaIoBaseDownload."""
+
+    def __init__(self, latency, file_id, data):
+        self.uri = f"https://fake.drive/files/{file_id}?alt=media"
+        self.headers = {}
+        self.http = _FakeHttp(latency, data)
+
+
+# === Drive ===
+
+def synthetic_background(seed, size=(1512, 2016)):
+    """A deterministic photo-like JPEG: gradient, a few shapes, some noise."""
+    rng = random.Random(seed)
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    tint = Image.new("RGB", size, tuple(rng.randrange(40, 220) for _ in range(3)))
+    img = Image.blend(img, tint, 0.6)
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        r = rng.randrange(40, 400)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    noise = Image.effect_noise(size, 24).convert("RGB")
+    img = Image.blend(img, noise, 0.15)
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+class FakeDrive:
+    """
+    Drive v3 lookalike backed by dicts.
+
+    Folders hold file entries; file contents are bytes. Created folders and
+    uploaded files are kept so a benchmark can check what a run produced.
+    latency applies to metadata calls (list, get, folder create, changes),
+    transfer_latency to downloads and uploads.
+    """
+
+    def __init__(self, latency=None, transfer_latency=None):
+        self.latency = latency or Latency()
+        self.transfer_latency = transfer_latency or self.latency
+        self._lock = threading.Lock()
+        self.files_by_id = {}
+        self.contents = {}
+        self.children = {}
+        self.uploaded_bytes = 0
+        self._next_id = 0
+
+    def _new_id(self, prefix):
+        with self._lock:
+            self._next_id += 1
+            return f"{prefix}{self._next_id:06d}"
+
+    def add_file(self, folder_id, name, data, mime_type):
+        file_id = self._new_id("file")
+        entry = {
+            "id": file_id,
+            "name": name,
+            "mimeType": mime_type,
+            "md5Checksum": hashlib.md5(data).hexdigest(),
+            "modifiedTime": "2025-01-01T00:00:00.000Z",
+            "parents": [folder_id],
+            "trashed": False,
+        }
+        with self._lock:
+            self.files_by_id[file_id] = entry
+            self.contents[file_id] = data
+            self.children.setdefault(folder_id, []).append(file_id)
+        return entry
+
+    def add_corpus(self, folder_ids, images_per_folder=8, size=(1512, 2016)):
+        """Fill each background folder with synthetic JPEGs."""
+        for n, folder_id in enumerate(folder_ids):
+            for k in range(images_per_folder):
+                self.add_file(folder_id, f"bg_{n}_{k}.jpg", synthetic_background(n * 1000 + k, size), "image/jpeg")
+
+    # --- resources ---
+
+    def files(self):
+        return _FakeFiles(self)
+
+    def changes(self):
+        return _FakeChanges(self)
+
+
+class _FakeFiles:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def list(self, q="", pageSize=100, pageToken=None, **kwargs):
+        match = re.search(r"'([^']+)' in parents", q)
+        folder_id = match.group(1) if match else None
+        images_only = "image/" in q
+        drive = self.drive
+
+        def body():
+            with drive._lock:
+                entries = [drive.files_by_id[i] for i in drive.children.get(folder_id, [])]
+            if images_only:
+                entries = [e for e in entries if e["mimeType"].startswith("image/")]
+            else:
+                entries = [e for e in entries if e["mimeType"] != "application/vnd.google-apps.folder"]
+            start = int(pageToken or 0)
+            page = entries[start:start + pageSize]
+            result = {"files": [dict(e) for e in page]}
+            if start + pageSize < len(entries):
+                result["nextPageToken"] = str(start + pageSize)
+            return result
+
+        return FakeRequest(drive.latency, body)
+
+    def get(self, fileId, **kwargs):
+        return FakeRequest(self.drive.latency, lambda: dict(self.drive.files_by_id[fileId]))
+
+    def get_media(self, fileId, **kwargs):
+        return FakeMediaRequest(self.drive.transfer_latency, fileId, self.drive.contents[fileId])
+
+    def create(self, body=None, media_body=None, **kwargs):
+        drive = self.drive
+        body = body or {}
+
+        def create():
+            parent = (body.get("parents") or [None])[0]
+            if media_body is None:
+                data = b""
+            else:
+                data = media_body.getbytes(0, media_body.size())
+            entry = drive.add_file(parent, body.get("name", "untitled"), data,
+                                   body.get("mimeType") or (media_body.mimetype() if media_body else ""))
+            with drive._lock:
+                drive.uploaded_bytes += len(data)
+            return {"id": entry["id"], "name": entry["name"]}
+
+        return FakeRequest(drive.transfer_latency if media_body is not None else drive.latency, create)
+
+
+class _FakeChanges:
+    def __init__(self, drive):
+        self.drive = drive
+
+    def getStartPageToken(self, **kwargs):
+        return FakeRequest(self.drive.latency, lambda: {"startPageToken": "1"})
+
+    def list(self, pageToken=None, **kwargs):
+        return FakeRequest(self.drive.latency, lambda: {"changes": [], "newStartPageToken": pageToken})
+
+
+# === Sheets / gspread ===
+
+class FakeSheets:
+    """Sheets v4 lookalike: named ranges map to fixed 2D value lists."""
+
+    def __init__(self, ranges, latency=None):
+        self.ranges = ranges
+        self.latency = latency or Latency()
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def batchGet(self, spreadsheetId=None, ranges=(), **kwargs):
+        return FakeRequest(self.latency, lambda: {
+            "valueRanges": [{"range": r, "values": self.ranges.get(r, [])} for r in ranges]
+        })
+
+    def get(self, spreadsheetId=None, range=None, **kwargs):
+        return FakeRequest(self.latency, lambda: {"range": range, "values": self.ranges.get(range, [])})
+
+
+class FakeWorksheet:
+    def __init__(self, title, latency):
+        self.title = title
+        self.latency = latency
+        self.rows = [["ID"]]
+        self._lock = threading.Lock()
+        self.append_calls = 0
+
+    def col_values(self, col):
+        if self.latency.wait():
+            raise RuntimeError("fake sheet unavailable")
+        with self._lock:
+            return [row[col - 1] if len(row) >= col else "" for row in self.rows]
+
+    def append_rows(self, rows, value_input_option=None):
+        if self.latency.wait():
+            raise RuntimeError("fake sheet unavailable")
+        with self._lock:
+            self.rows.extend(list(row) for row in rows)
+            self.append_calls += 1
+
+
+class FakeGspread:
+    def __init__(self, latency=None):
+        self.latency = latency or Latency()
+        self.worksheets = {}
+
+    def open_by_key(self, key):
+        return self
+
+    def worksheet(self, title):
+        return self.worksheets.setdefault(title, FakeWorksheet(title, self.latency))
+
+
+# === OpenAI ===
+
+WORDS = ("honestly", "nobody", "tells", "you", "this", "but", "your", "twenties", "are", "for",
+         "figuring", "it", "out", "slowly", "and", "that", "is", "fine", "real", "talk")
+
+
+class FakeOpenAI:
+    """
+    chat.completions / files / batches lookalike.
+
+    Completions are random 60-80 character lines of stock words, so variation
+    uniqueness checks behave like with the real model. Batches complete on
+    the first retrieve.
+    """
+
+    def __init__(self, latency=None, seed=0):
+        self.latency = latency or Latency()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._files = {}
+        self._batches = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve_batch)
+
+    def _line(self):
+        with self._lock:
+            words = []
+            while len(" ".join(words)) < 60:
+                words.append(self._random.choice(WORDS))
+            return " ".join(words)[:80]
+
+    def _completion_body(self, messages, n=1, max_tokens=50, **kwargs):
+        prompt_tokens = sum(len(m["content"].split()) for m in messages)
+        choices = [{"index": i, "message": {"role": "assistant", "content": self._line()}} for i in range(n)]
+        return {
+            "choices": choices,
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 15 * n, "total_tokens": prompt_tokens + 15 * n},
+        }
+
+    def _create_completion(self, model=None, messages=(), temperature=None, max_tokens=50, n=1, **kwargs):
+        if self.latency.wait():
+            raise RuntimeError("fake OpenAI error (503)")
+        body = self._completion_body(messages, n=n, max_tokens=max_tokens)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=c["message"]["content"])) for c in body["choices"]],
+            usage=SimpleNamespace(**body["usage"], prompt_tokens_details=None),
+        )
+
+    def _create_file(self, file=None, purpose=None):
+        data = file.read()
+        with self._lock:
+            file_id = f"file-{len(self._files) + 1}"
+            self._files[file_id] = data.decode("utf-8") if isinstance(data, bytes) else data
+        return SimpleNamespace(id=file_id)
+
+    def _file_content(self, file_id):
+        return SimpleNamespace(text=self._files[file_id])
+
+    def _create_batch(self, input_file_id=None, endpoint=None, completion_window=None):
+        lines = []
+        for line in self._files[input_file_id].splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            body = self._completion_body(**request["body"])
+            lines.append(json.dumps({"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}}))
+        with self._lock:
+            batch_id = f"batch-{len(self._batches) + 1}"
+            output_id = f"file-out-{batch_id}"
+            self._files[output_id] = "\n".join(lines)
+            self._batches[batch_id] = SimpleNamespace(id=batch_id, status="completed", output_file_id=output_id, error_file_id=None)
+        return self._batches[batch_id]
+
+    def _retrieve_batch(self, batch_id):
+        self.latency.wait()
+        return self._batches[batch_id]
+
+
+def install_fakes(drive, sheets, gspread_client, openai_client):
+    """Route google_clients and the OpenAI client to the given fakes."""
+    google_clients.override_service("drive", "v3", drive)
+    google_clients.override_service("sheets", "v4", sheets)
+    google_clients.override_gspread_client(gspread_client)
+    set_openai_client(openai_client)
@@ -0,0 +1,132 @@
+"""
+Run the offline benchmark suite and compare it with a saved baseline.
+
+Runs the microbenchmarks (bench_micro.py) and one full main() pass against
+the fakes (bench_pipeline.py), writes benchmarks/results/latest.json and
+prints every metric next to the baseline. Save a baseline on the commit you
+want to compare against, then run again on the next one:
+
+    python benchmarks/run_benchmarks.py --save-baseline
+    git checkout <other commit>
+    python benchmarks/run_benchmarks.py
+
+Exits non-zero when a timing is slower than the baseline by more than
+--tolerance (default 20%).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+import bench_micro  # noqa: E402
+import bench_pipeline  # noqa: E402
+
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+RESULTS_PATH = os.path.join(HERE, "results", "latest.json")
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results):
+    """Comparable metrics: name -> (value, higher_is_better)."""
+    flat = {f"micro.{name}": (value, False) for name, value in results["micro"].items()}
+    pipeline = results["pipeline"]
+    flat["pipeline.elapsed_s"] = (pipeline["elapsed_s"], False)
+    flat["pipeline.carousels_per_min"] = (pipeline["carousels_per_min"], True)
+    for stage, stats in pipeline["stages"].items():
+        flat[f"pipeline.{stage}.p50_ms"] = (stats["p50"] * 1000, False)
+    return flat
+
+
+def compare(current, baseline, tolerance, min_ms=1.0):
+    """Print current vs baseline, return the metrics that regressed beyond tolerance (timings under min_ms are noise)."""
+    regressions = []
+    now, before = flatten(current), flatten(baseline)
+    print(f"{'metric':<44}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, (value, higher_is_better) in sorted(now.items()):
+        if name not in before:
+            print(f"{name:<44}{'-':>12}{value:>12.2f}")
+            continue
+        old = before[name][0]
+        change = (value - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        if name.endswith("_ms") and max(old, value) < min_ms:
+            worse = 0.0
+        flag = " ❌" if worse > tolerance else ""
+        print(f"{name:<44}{old:>12.2f}{value:>12.2f}{change * 100:>+9.1f}%{flag}")
+        if worse > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    bench_pipeline.add_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per microbenchmark (best is kept)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="timings below this are never flagged")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    # Both benchmarks print progress per slide; only the report goes to the terminal
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        micro = bench_micro.run(repeat=args.repeat)
+        pipeline = bench_pipeline.run(
+            rows=args.rows, variations=args.variations, latency=args.latency,
+            transfer_latency=args.transfer_latency, llm_latency=args.llm_latency,
+            error_rate=args.error_rate, images_per_folder=args.images_per_folder,
+            render_workers=args.render_workers, llm_mode=args.llm_mode, preview=args.preview,
+        )
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "args": vars(args),
+        "micro": micro,
+        "pipeline": pipeline,
+    }
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    with open(RESULTS_PATH, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {RESULTS_PATH}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline} (commit {results['commit']})")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print(f"Comparing with baseline from commit {baseline.get('commit')} ({baseline.get('timestamp')})")
+    regressions = compare(results, baseline, args.tolerance, args.min_ms)
+    if regressions:
+        print(f"❌ {len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+    print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
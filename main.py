@@ -1,207 +1,59 @@
 import os
 import io
-import time
+import sys
+import threading
+from functools import partial
 from datetime import datetime
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
-from googleapiclient.http import MediaIoBaseUpload
-from google.oauth2.service_account import Credentials
 from PIL import Image
-from modules.image_handler import process_carousel
-from modules.llm import generate_unique_variations
+from modules.image_handler import render_preview_carousel
+from modules.render_executor import RenderExecutor
+from modules.phone_cache import PhoneBoxCache, drive_key
+from modules import google_clients
+from modules.drive_index import DriveFolderIndex
+from modules.download_cache import DownloadCache
+from modules.font_store import FontStore, FONT_EXTENSIONS
+from modules.google_clients import CLIENT_STATS
+from modules.llm import get_openai_client, generate_unique_variations, generate_row_texts
 import yaml
-import random
 from dotenv import load_dotenv
 import openai
-from openai import OpenAI
 import os
 from itertools import chain
-import gspread
-from decimal import Decimal
-from typing import Optional
+from modules.cost_tracker import COST
+from modules.llm_batch import generate_rows_batch
+from modules.llm_cache import LLMResponseCache
+from modules.sheet_snapshot import SheetSnapshot
+from modules.output_writer import CarouselOutputWriter
+from modules.upload_engine import UploadEngine
+from modules.utils import cleanup_temp_dir
+from modules.background_cache import background_cache_info
+from modules.render_plan import plan_cache_info, sprite_cache_info
+from modules.pipeline import Pipeline, Stage, CarouselItem
+from modules.preview import PreviewCollector, preview_settings
+from modules import run_journal
+from modules.run_journal import RunJournal, row_hash
+from modules.metrics import METRICS
 
 NUM_VARIATIONS = 1 # 3 is max for now as there are 4 folders
 NUM_DATA_ROWS = 'all' # if 'all' then all rows in google sheet with slide texts are iterated
 MODEL="gpt-4"
 
-class CostTracker:
-
-    def __init__(self):
-        self.total_prompt_tokens = 0
-        self.total_completion_tokens = 0
-        self.total_cached_prompt_tokens = 0  # if prompt caching is used
-        self.total_calls = 0
-        self.total_usd = Decimal("0")
-
-    def add(self, response, model_name: str):
-        self.total_calls += 1
-        usage = getattr(response, "usage", None)
-        if not usage:
-            return  # nothing to add
-
-        prompt_tokens = int(getattr(usage, "prompt_tokens", 0) or 0)
-        completion_tokens = int(getattr(usage, "completion_tokens", 0) or 0)
-
-        # Some responses include caching details
-        cached = 0
-        details = getattr(usage, "prompt_tokens_details", None)
-        if details and hasattr(details, "cached_tokens"):
-            cached = int(details.cached_tokens or 0)
-
-        self.total_prompt_tokens += prompt_tokens
-        self.total_completion_tokens += completion_tokens
-        self.total_cached_prompt_tokens += cached
-
-        rates = PRICES_PER_1K.get(model_name, None)
-        if not rates:
-            return  # unknown model rate, skip cost math to avoid wrong totals
-
-        # Split cached vs non cached prompt tokens when a cached rate exists
-        cached_rate: Optional[Decimal] = rates.get("cached_input")
-        if cached_rate is not None and cached > 0:
-            uncached_prompt = max(prompt_tokens - cached, 0)
-            cost_input = (Decimal(uncached_prompt) * rates["input"] +
-                          Decimal(cached) * cached_rate) / Decimal(1000)
-        else:
-            cost_input = (Decimal(prompt_tokens) * rates["input"]) / Decimal(1000)
-
-        cost_output = (Decimal(completion_tokens) * rates["output"]) / Decimal(1000)
-        self.total_usd += (cost_input + cost_output)
-
-    def summary(self) -> str:
-        return (
-            f"API calls: {self.total_calls}\n"
-            f"Prompt tokens: {self.total_prompt_tokens} "
-            f"(cached: {self.total_cached_prompt_tokens})\n"
-            f"Completion tokens: {self.total_completion_tokens}\n"
-            f"Total cost: ${self.total_usd.quantize(Decimal('0.0001'))} USD"
-        )
-
-COST = CostTracker()
-
-PRICES_PER_1K = {
-    "gpt-3.5-turbo": {
-        "input":  Decimal("0.0015"),   # $1.50 per 1M tokens
-        "output": Decimal("0.0020"),   # $2.00 per 1M tokens
-        "cached_input": None
-    },
-    "gpt-3.5-turbo-16k": {
-        "input":  Decimal("0.0030"),   # $3.00 per 1M
-        "output": Decimal("0.0040"),   # $4.00 per 1M
-        "cached_input": None
-    },
-    "gpt-3.5-turbo-0613": {
-        "input":  Decimal("0.0015"),
-        "output": Decimal("0.0020"),
-        "cached_input": None
-    },
-    # For classic davinci, curie, etc. if needed
-    "text-davinci-003": {
-        "input":  Decimal("0.02"),     # $20 per 1M
-        "output": Decimal("0.02"),
-        "cached_input": None
-    },
-    "text-curie-001": {
-        "input":  Decimal("0.002"),    # $2 per 1M
-        "output": Decimal("0.002"),
-        "cached_input": None
-    },
-    "text-babbage-001": {
-        "input":  Decimal("0.0005"),
-        "output": Decimal("0.0005"),
-        "cached_input": None
-    },
-    "text-ada-001": {
-        "input":  Decimal("0.0004"),
-        "output": Decimal("0.0004"),
-        "cached_input": None
-    },
-    # Your existing GPT-4 and GPT-4o entries below
-    "gpt-4": {
-        "input":  Decimal("0.03"),
-        "output": Decimal("0.06"),
-        "cached_input": None
-    },
-    "gpt-4o": {
-        "input":  Decimal("0.005"),
-        "output": Decimal("0.02"),
-        "cached_input": Decimal("0.0025")
-    },
-    "gpt-4o-mini": {
-        "input":  Decimal("0.0006"),
-        "output": Decimal("0.0024"),
-        "cached_input": Decimal("0.0003")
-    },
-}
-
-
-
-
 # Load config
 with open("config.yaml", "r") as f:
     config = yaml.safe_load(f)
 # Load environment variables
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def generate_caption(temperature, strings, prompt_template, max_tokens=50):
-    # Join slides into a single text block
-
-    slides_text = "\n".join(f"Slide {i+1}: {text}" for i, text in enumerate(strings))
-    print(f"{slides_text}")
-
-    print('inside caption generator ################### %$')
-
-    # Build the prompt
-    prompt = prompt_template.replace("{slides_text}", slides_text)
-
-    # print(prompt)
-    # exit()
-
-    # Call OpenAI API
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=temperature,
-        max_tokens=max_tokens,
-    )
-
-    # Extract and return the caption text
-    COST.add(response, MODEL)  # <-- track cost
-    return response.choices[0].message.content.strip()
-
-def generate_variations(temperature, non_hook_prompt_template, hook_prompt_template, strings, num_variations, max_tokens=50):
-    variation_buckets = [[] for _ in range(num_variations)]
-
-    for idx, original in enumerate(strings):
-        generated = set()
-
-        while len(generated) < num_variations:
-            # Choose the right template
-            if idx == 0:
-                final_prompt = hook_prompt_template.replace("{original}", original)
-            else:
-                final_prompt = non_hook_prompt_template.replace("{original}", original)
-
-            response = client.chat.completions.create(
-                model=MODEL,
-                messages=[{"role": "user", "content": final_prompt}],
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            COST.add(response, MODEL)  # <-- track cost
-
-            variation = response.choices[0].message.content.strip().replace('"', '')
-            generated.add(variation)
-
-        # Assign variations to their respective buckets
-        for i, v in enumerate(list(generated)[:num_variations]):
-            variation_buckets[i].append(v)
-        
-        print([strings])
-        print(variation_buckets)
-
-    return [strings] + variation_buckets
+# Replays unchanged prompts from cache/llm; set llm_cache.bypass or LLM_CACHE_BYPASS=1 for fresh output
+LLM_CACHE = LLMResponseCache.from_config(config)
+# Serial unless config.yaml sets render_workers > 1; the pool starts on first use
+RENDERER = RenderExecutor.from_config(config)
+UPLOADER = UploadEngine.from_config(config)
+# Slides go from the renderer to Drive as JPEG bytes; write_slides_to_disk keeps temp/carousel_* dirs for debugging
+IN_MEMORY_RENDER = not config.get("write_slides_to_disk", False)
+JOURNAL = RunJournal()
+PHONE_CACHE = PhoneBoxCache() if config.get("phone_detection", False) else None
+DOWNLOAD_CACHE = DownloadCache.from_config(config)
 
 
 # === CONFIGURE YOUR FOLDER IDS AND TEXTS HERE ===
@@ -214,6 +66,10 @@ FOLDER_IDS = [
 ]
 
 
+# Local listing of the background folders, see modules/drive_index.py.
+# Rebuild from scratch with: python main.py rebuild-drive-index
+DRIVE_INDEX = DriveFolderIndex(FOLDER_IDS)
+
 GDRIVE_TIKTOK_ACCOUNT_FOLDER_IDS = {
     "CommentScout TikTok Account #1": "1JZrBRDFNZGvIjiFT94gPzCowB5HtqGdR",
     "CommentScout TikTok Account #2": "1pBCM4wFO_gf635FEb8JLDwlHtdhr8o6Z",
@@ -221,129 +77,113 @@ GDRIVE_TIKTOK_ACCOUNT_FOLDER_IDS = {
     "CommentScout TikTok Account #4": "1ZIrLBAhn5bKcTw0J6tRWzBCSn9Zrgzw7"
 }
 
-def get_prompt_from_sheet(spreadsheet_id, range_name):
-    SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
-    creds = Credentials.from_service_account_file('credentials.json', scopes=SCOPES)
-    service = build('sheets', 'v4', credentials=creds)
-
-    sheet = service.spreadsheets()
-    result = sheet.values().get(
-        spreadsheetId=spreadsheet_id,
-        range=range_name
-    ).execute()
-
-    values = result.get('values', [])
-    if values and values[0]:
-        return values[0][0]  # First cell
-    else:
-        raise ValueError("❌ Prompt cell is empty or missing.")
-
-def get_sheet_rows(spreadsheet_id, range_name):
-    SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
-    creds = Credentials.from_service_account_file('credentials.json', scopes=SCOPES)
-    service = build('sheets', 'v4', credentials=creds)
-
-    sheet = service.spreadsheets()
-    result = sheet.values().get(
-        spreadsheetId=spreadsheet_id,
-        range=range_name
-    ).execute()
-
-    values = result.get('values', [])
-
-    # Return all rows except the header
-    return values[1:] if values else []
+SHEET_ID = '1O6lNd7gIEnI_K8GxNFYSUj9WVKtveU1mwWIVgL0g7J8'
+OUTPUT_WRITER = CarouselOutputWriter(SHEET_ID, 'Carousel Outputs', batch_size=config.get("output_batch_size", 10))
 
 FONT_COLORS = ["#ffffff"]
 
 # LAYOUT = "upper_middle"
 LAYOUT = "auto"
 FONTS_FOLDER_ID = "1mwenttTQ04TKdd0EMIfotO7CyucQDkuF"
+# Resolved once per run in main(), shared by every row and render worker
+FONT_STORE = FontStore(FONTS_FOLDER_ID)
 
 # === Google Drive Setup ===
 def get_drive_service():
-    SCOPES = ['https://www.googleapis.com/auth/drive']
-    creds = Credentials.from_service_account_file('credentials.json', scopes=SCOPES)
-    return build('drive', 'v3', credentials=creds)
-
-# === Fetch First Image from Folder ===
-def get_images_from_folder(folder_id, max_images=100):
-    drive_service = get_drive_service()
-    query = f"'{folder_id}' in parents and (mimeType contains 'image/')"
-    response = drive_service.files().list(
-        q=query,
-        spaces='drive',
-        fields='files(id, name, mimeType)',
-        pageSize=max_images,
-        supportsAllDrives=True
-    ).execute()
-    return response.get('files', [])
+    # Shared per-process client, see modules/google_clients.py
+    return google_clients.get_drive_service()
 
 # === Download File from Drive ===
-def download_image_from_drive(file_id, output_dir, index, is_font=False):
-    drive_service = get_drive_service()
-    try:
-        file_metadata = drive_service.files().get(fileId=file_id, fields='mimeType, name', supportsAllDrives=True).execute()
-        mime_type = file_metadata.get('mimeType')
-        file_name = file_metadata.get('name')
-
-        mime_to_ext = {
-            'image/jpeg': '.jpg',
-            'image/png': '.png',
-            'image/gif': '.gif',
-            'image/bmp': '.bmp',
-            'image/tiff': '.tiff',
-            'application/x-font-ttf': '.ttf',
-            'application/font-sfnt': '.ttf',
-            'application/vnd.google-apps.font': '.ttf',
-            'font/ttf': '.ttf',
-        }
-
-        if mime_type not in mime_to_ext:
-            print(f"File {file_id} is not a valid image/font (MIME: {mime_type})")
-            return None
-
-        ext = mime_to_ext[mime_type] if not is_font else '.ttf'
-        # output_path = os.path.join(output_dir, "font.ttf" if is_font else f"slide_{index+1}{ext}")
-        output_path = os.path.join(output_dir, "font.ttf" if is_font else f"raw_slide_{index+1}{ext}")
+MIME_TO_EXT = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/bmp': '.bmp',
+    'image/tiff': '.tiff',
+    'application/x-font-ttf': '.ttf',
+    'application/font-sfnt': '.ttf',
+    'application/vnd.google-apps.font': '.ttf',
+    'font/ttf': '.ttf',
+    'font/otf': '.otf',
+    'application/vnd.ms-opentype': '.otf',
+    'application/x-font-otf': '.otf',
+}
 
+def _extension(mime_type, name=None, is_font=False):
+    # A font keeps its own .ttf/.otf extension, anything else follows its MIME type
+    if is_font and name:
+        ext = os.path.splitext(name)[1].lower()
+        if ext in FONT_EXTENSIONS:
+            return ext
+    return MIME_TO_EXT[mime_type]
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def download_image_from_drive(file_id, output_dir, index, is_font=False, md5=None, mime_type=None, as_bytes=False, name=None):
+    """
+    Return a local path for a Drive image/font, served from DOWNLOAD_CACHE when possible.
+
+    With md5 and mime_type known (e.g. from DRIVE_INDEX) a cache hit makes no
+    network call and a miss goes straight to the download. Cached files are shared, so callers must not modify them.
+    output_dir and index are kept for callers but files now live in the cache.
+    as_bytes returns the file's contents instead, straight from the download buffer on a miss.
+    name (the Drive file name) gives a font its extension before the metadata is fetched.
+    """
+    try:
+        drive_service = get_drive_service()
+        if md5 and mime_type in MIME_TO_EXT:
+            # Everything the cache key needs is known: no metadata call, hit or miss
+            ext = _extension(mime_type, name, is_font)
+            version = md5
+            cached = DOWNLOAD_CACHE.lookup(file_id, version, ext)
+            if cached:
+                return _read_bytes(cached) if as_bytes else cached
+        else:
+            file_metadata = drive_service.files().get(
+                fileId=file_id,
+                fields='mimeType, name, md5Checksum, modifiedTime',
+                supportsAllDrives=True
+            ).execute()
+            mime_type = file_metadata.get('mimeType')
+            file_name = file_metadata.get('name')
+
+            if mime_type not in MIME_TO_EXT:
+                print(f"File {file_id} is not a valid image/font (MIME: {mime_type})")
+                return None
+
+            ext = _extension(mime_type, file_name, is_font)
+            # Google-native files have no md5, their modifiedTime identifies the version instead
+            version = file_metadata.get('md5Checksum') or file_metadata.get('modifiedTime', '').replace(':', '-')
+            cached = DOWNLOAD_CACHE.lookup(file_id, version, ext)
+            if cached:
+                return _read_bytes(cached) if as_bytes else cached
 
         request = drive_service.files().get_media(fileId=file_id)
-        with io.FileIO(output_path, 'wb') as fh:
-            downloader = MediaIoBaseDownload(fh, request)
+        buffer = io.BytesIO()
+        with METRICS.timer("download", file=file_id):
+            downloader = MediaIoBaseDownload(buffer, request)
             done = False
             while not done:
                 status, done = downloader.next_chunk()
-        time.sleep(0.2)
+        data = buffer.getvalue()
+        METRICS.incr("download_bytes", len(data))
 
+        # Validate before the file enters the cache
         if is_font:
             from PIL import ImageFont
-            ImageFont.truetype(output_path, 10)
+            ImageFont.truetype(io.BytesIO(data), 10)
         else:
-            with Image.open(output_path) as img:
+            with Image.open(io.BytesIO(data)) as img:
                 img.verify()
-        return output_path
+        path = DOWNLOAD_CACHE.store(file_id, version, ext, data)
+        return data if as_bytes else path
 
     except Exception as e:
         print(f"❌ Error downloading file {file_id}: {e}")
         return None
 
-# === Download First TTF from Fonts Folder ===
-def download_first_font_from_folder(folder_id, output_dir):
-    drive_service = get_drive_service()
-    query = f"'{folder_id}' in parents and mimeType != 'application/vnd.google-apps.folder'"
-    response = drive_service.files().list(
-        q=query,
-        spaces='drive',
-        fields='files(id, name, mimeType)',
-        supportsAllDrives=True
-    ).execute()
-    for file in response.get('files', []):
-        if file['name'].lower().endswith('.ttf'):
-            return download_image_from_drive(file['id'], output_dir, 0, is_font=True)
-    print("⚠️ No TTF font found in folder")
-    return None
-
 def create_drive_folder(folder_name, parent_folder_id):
     drive_service = get_drive_service()
     folder_metadata = {
@@ -364,187 +204,377 @@ def create_drive_folder(folder_name, parent_folder_id):
         print(f"❌ Failed to create folder: {e}")
         return None
 
-def upload_images_to_drive(folder_id, local_dir):
-    drive_service = get_drive_service()
-    uploaded_files = []
-
-    for filename in sorted(os.listdir(local_dir)):
-        if filename.lower().endswith((".jpg", ".jpeg", ".png")):
-            file_path = os.path.join(local_dir, filename)
-            file_metadata = {
-                "name": filename,
-                "parents": [folder_id]
-            }
-            media = MediaIoBaseUpload(io.FileIO(file_path, 'rb'), mimetype="image/jpeg")
-            try:
-                uploaded_file = drive_service.files().create(
-                    body=file_metadata,
-                    media_body=media,
-                    fields="id, name",
-                    supportsAllDrives=True  # ✅ Required for Shared Drives
-                ).execute()
-                uploaded_files.append(uploaded_file["id"])
-                print(f"📤 Uploaded {filename} to Drive folder {folder_id}")
-            except Exception as e:
-                print(f"❌ Failed to upload {filename}: {e}")
-
-    return uploaded_files
-
-def get_next_id():
-    gc = gspread.service_account(filename='credentials.json')
-    sh = gc.open_by_key('1O6lNd7gIEnI_K8GxNFYSUj9WVKtveU1mwWIVgL0g7J8')
-    worksheet = sh.worksheet('Carousel Outputs')
-
-    # Get all values in column A
-    col_a_values = worksheet.col_values(1)  # Column A
-
-    # Filter out empty cells
-    col_a_values = [v for v in col_a_values if v.strip() != ""]
-
-    if not col_a_values:
-        return "#1"  # If no IDs exist yet
-
-    last_id = col_a_values[-1]  # Last non-empty cell value in col A
-    numeric_part = int(last_id.strip().lstrip("#"))
-    next_id = numeric_part + 1
-
-    print(next_id)
-
-    return f"#{next_id}"
-
-
-def add_carousel_to_gsheet(slide_texts, id, caption, temperature, cost):
-    # Authenticate using your service account file
-    gc = gspread.service_account(filename='credentials.json')
-
-    # Open the sheet by ID
-    sh = gc.open_by_key('1O6lNd7gIEnI_K8GxNFYSUj9WVKtveU1mwWIVgL0g7J8')
-
-    # Open the "Carousel Outputs" tab
-    worksheet = sh.worksheet('Carousel Outputs')
-
-    # Build the row: id in col A, slides in cols B-G, caption in col H
-    row = [id] + slide_texts
-
-    # Ensure caption is in column H (index 7 in 0-based Python list)
-    while len(row) < 7:  # Fill blanks until before column H
-        row.append("")
-    row.append(caption)
-    row.append(temperature)
-    row.append(cost)
-
-    # Append row to the sheet
-    worksheet.append_row(row, value_input_option='RAW')
+def upload_images_to_drive(folder_id, local_dir, file_paths=None, on_uploaded=None):
+    """Upload images from local_dir, or exactly file_paths in the given order when passed. Returns IDs in that order."""
+    if file_paths is None:
+        file_paths = [os.path.join(local_dir, f) for f in sorted(os.listdir(local_dir))]
+    file_paths = [p for p in file_paths if p and p.lower().endswith((".jpg", ".jpeg", ".png"))]
+    return [file_id for file_id in UPLOADER.upload_files(folder_id, file_paths, on_uploaded) if file_id]
 
-def main():
+def upload_slides_to_drive(folder_id, slides, on_uploaded=None, skip=()):
+    """Upload in-memory slides (JPEG bytes, None for skipped slides) as slide1.jpg.. in slide order, except names in skip."""
+    buffers = [(f"slide{n}.jpg", data) for n, data in enumerate(slides, start=1) if data and f"slide{n}.jpg" not in skip]
+    return [file_id for file_id in UPLOADER.upload_buffers(folder_id, buffers, on_uploaded) if file_id]
 
-    test_texts = []
-    sheet_id = '1O6lNd7gIEnI_K8GxNFYSUj9WVKtveU1mwWIVgL0g7J8'
-    sheet_rows = get_sheet_rows(sheet_id, 'Sheet1')
-    temperature = float(get_prompt_from_sheet(sheet_id, 'Prompts!G2'))
+def get_next_id():
+    # Column A is read once per run, later IDs are allocated locally
+    return OUTPUT_WRITER.allocate_id()
+
+
+def add_carousel_to_gsheet(slide_texts, id, caption, temperature, cost, on_written=None):
+    # Buffered, rows reach the sheet in append_rows batches (and on exit)
+    OUTPUT_WRITER.add(slide_texts, id, caption, temperature, cost, on_written=on_written)
+
+def warm_phone_cache(batch_size=16):
+    """Detect phones across every background folder, downloading only images not cached yet."""
+    cache = PHONE_CACHE or PhoneBoxCache()
+    DRIVE_INDEX.sync()
+    raw_dir = os.path.join("temp", "raw", "phones")
+    os.makedirs(raw_dir, exist_ok=True)
+    for folder_id in FOLDER_IDS:
+        images = DRIVE_INDEX.images(folder_id)
+        pending = [f for f in images if drive_key(f['id'], f.get('modifiedTime')) not in cache]
+        print(f"📱 Folder {folder_id}: {len(images) - len(pending)} cached, {len(pending)} to detect")
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            paths, keys = [], []
+            for n, f in enumerate(chunk):
+                path = download_image_from_drive(f['id'], raw_dir, n, md5=f.get('md5Checksum'), mime_type=f.get('mimeType'))
+                if path:
+                    paths.append(path)
+                    keys.append(drive_key(f['id'], f.get('modifiedTime')))
+            cache.detect(paths, keys, batch_size=batch_size)
+
+# === Pipeline stages ===
+# Each takes one CarouselItem and runs on its stage's thread pool, see modules/pipeline.py
+
+_phone_lock = threading.Lock()
+
+
+def generate_texts_stage(item, sheet, temperature, batch_results=None):
+    """Row -> one CarouselItem per variation, with its slide texts and the row's caption."""
+    font_path = FONT_STORE.choose(config.get("font_selection", "first"))
+
+    SLIDE_TEXTS = []
+    for array in item.row:
+        slide_text = array.strip()  # get the first column
+        SLIDE_TEXTS.append(slide_text)
+    print(f"{SLIDE_TEXTS}")
+
+    saved = JOURNAL.get(item.row_index, 0, item.row_hash)
+    if saved is not None:
+        # Generated by the interrupted run, don't pay for it again
+        CAROUSELS, CAPTION = saved[1]["carousels"], saved[1]["caption"]
+        print(f"♻️ Row {item.row_index}: texts restored from the run journal")
+    elif batch_results is not None:
+        if item.row_index not in batch_results:
+            raise ValueError("no batch result for this row")
+        CAROUSELS, CAPTION = batch_results[item.row_index]
+    else:
+        # All slides' variations and the caption are requested concurrently
+        CAROUSELS, CAPTION = generate_row_texts(
+            get_openai_client(), MODEL, temperature,
+            sheet.prompt('Prompts!C2'),
+            sheet.prompt('Prompts!A2'),
+            sheet.prompt('Prompts!E2'),
+            SLIDE_TEXTS, NUM_VARIATIONS, COST,
+            max_tokens=100, caption_max_tokens=150,
+            max_concurrency=config.get("llm_concurrency", 8),
+            cache=LLM_CACHE
+        )
+    print(CAROUSELS)
+
+    if len(CAROUSELS) != NUM_VARIATIONS + 1:
+        raise ValueError(f"variations not complete ({len(CAROUSELS) - 1}/{NUM_VARIATIONS})")
+    if saved is None:
+        JOURNAL.mark(item.row_index, 0, item.row_hash, run_journal.TEXTS, carousels=CAROUSELS, caption=CAPTION)
+
+    variations = []
+    for i in range(1, len(CAROUSELS)):
+        variation = CarouselItem(
+            item.row_index, item.row, variation=i, slide_texts=CAROUSELS[i], caption=CAPTION,
+            font_path=font_path, row_hash=item.row_hash
+        )
+        state = JOURNAL.get(item.row_index, i, item.row_hash)
+        if state is not None:
+            variation.stage, data = state
+            if variation.stage == run_journal.RECORDED:
+                print(f"⏭️ {variation.label} already finished (ID {data.get('carousel_id')})")
+                continue
+            variation.carousel_id = data.get("carousel_id")
+            variation.folder_id = data.get("folder_id")
+            variation.file_ids = data.get("file_ids", [])
+            variation.uploaded_slides = data.get("uploaded_slides", {})
+        variations.append(variation)
+    return variations
+
+def backgrounds_stage(item):
+    """Pick a background per slide from the local Drive index and fetch it (download cache first)."""
+    if item.stage == run_journal.UPLOADED:
+        return item
+    raw_dir = os.path.join("temp", "raw")
+    print(f"Variation: {item.variation + 1}")
+    for j, folder_id in enumerate(FOLDER_IDS):
+        if folder_id and folder_id.strip():
+            # Picked from the local index, no Drive list call
+            img_file = DRIVE_INDEX.random_image(folder_id)
+            if img_file:
+                img_path = download_image_from_drive(
+                    img_file['id'], raw_dir, j,
+                    md5=img_file.get('md5Checksum'), mime_type=img_file.get('mimeType'),
+                    as_bytes=IN_MEMORY_RENDER
+                )
+                item.image_paths.append(img_path)
+                item.phone_keys.append(drive_key(img_file['id'], img_file.get('modifiedTime')) if img_path else None)
+            else:
+                print(f"❌ No image found in folder {folder_id}")
+                item.image_paths.append(None)
+                item.phone_keys.append(None)
+        else:
+            print(f"⚠️ Empty folder ID for slide {j+1}")
+            item.image_paths.append(None)
+            item.phone_keys.append(None)
+
+    if PHONE_CACHE is not None:
+        # The detector is shared, one inference at a time
+        with _phone_lock:
+            item.phone_boxes = PHONE_CACHE.detect(item.image_paths, item.phone_keys)
+    return item
+
+def render_stage(item):
+    if item.stage == run_journal.UPLOADED:
+        return item
+    job = (LAYOUT, item.image_paths, item.font_path, config, FONT_COLORS, item.slide_texts, item.phone_boxes)
+    [(item.output_dir, item.slides)] = RENDERER.render_carousels([job], in_memory=IN_MEMORY_RENDER)
+    item.image_paths = None  # backgrounds are no longer needed, let them be freed
+    if item.stage is None:
+        JOURNAL.mark(item.row_index, item.variation, item.row_hash, run_journal.RENDERED)
+    return item
+
+def upload_stage(item):
+    if item.stage == run_journal.UPLOADED:
+        return item
+    # An interrupted run may already have allocated the ID and created the folder
+    if item.folder_id is not None:
+        print(f"♻️ {item.label}: reusing ID {item.carousel_id} and Drive folder {item.folder_id}")
+        upload_slides(item)
+        return item
+
+    item.carousel_id = get_next_id()
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H.%M.%S")
+    subfolder_name = f"ID:{item.carousel_id}-carousel-{timestamp}"
+    # Convert dict values to a list
+    folder_ids = list(GDRIVE_TIKTOK_ACCOUNT_FOLDER_IDS.values())
+
+    # Access value by index, e.g., index 2
+    parent_folder_id = folder_ids[item.variation]
+
+    item.folder_id = create_drive_folder(subfolder_name, parent_folder_id)
+    if item.folder_id is None:
+        raise RuntimeError(f"could not create Drive folder {subfolder_name}")
+    JOURNAL.mark(item.row_index, item.variation, item.row_hash, run_journal.FOLDER,
+                 carousel_id=item.carousel_id, folder_id=item.folder_id)
+    upload_slides(item)
+    return item
+
+def upload_slides(item):
+    # Each slide is journaled as it lands; slides an interrupted run already put in the folder are not sent again
+    uploaded = dict(item.uploaded_slides)
+    if item.uploaded_slides:
+        print(f"♻️ {item.label}: {len(item.uploaded_slides)} slide(s) already in folder {item.folder_id}, not uploaded again")
+
+    def on_uploaded(name, file_id):
+        uploaded[name] = file_id
+        JOURNAL.mark_slide(item.row_index, item.variation, name, file_id)
+
+    if IN_MEMORY_RENDER:
+        names = [f"slide{n}.jpg" for n, data in enumerate(item.slides, start=1) if data]
+        upload_slides_to_drive(item.folder_id, item.slides, on_uploaded, skip=uploaded)
+    else:
+        paths = [path for path in item.slides if path]
+        names = [os.path.basename(path) for path in paths]
+        upload_images_to_drive(item.folder_id, item.output_dir, [p for p in paths if os.path.basename(p) not in uploaded], on_uploaded)
+    item.slides = None
+    item.file_ids = [uploaded[name] for name in names if name in uploaded]
+    item.uploaded_slides = uploaded
+    if len(item.file_ids) != len(names):
+        raise RuntimeError(f"{len(names) - len(item.file_ids)} slide(s) failed to upload to folder {item.folder_id}")
+    JOURNAL.mark(item.row_index, item.variation, item.row_hash, run_journal.UPLOADED, file_ids=item.file_ids)
+
+def record_stage(item, temperature):
+    cost = 0
+    # Journaled as recorded only once the buffered row has really been appended
+    add_carousel_to_gsheet(
+        item.slide_texts, f"{item.carousel_id}", item.caption, temperature, cost,
+        on_written=partial(JOURNAL.mark, item.row_index, item.variation, item.row_hash, run_journal.RECORDED)
+    )
+    print(f"✅ Uploaded carousel to folder: {item.variation + 1}")
+    METRICS.incr("carousels")
+    return item
 
-    # Skip header row
-    data_rows = sheet_rows[1:]
+def preview_render_stage(item, scale):
+    item.slides = render_preview_carousel(
+        LAYOUT, item.image_paths, item.font_path, config, FONT_COLORS, item.slide_texts, scale, item.phone_boxes
+    )
+    item.image_paths = None
+    return item
+
+def preview_stage(item, collector):
+    collector.add(item.row_index, item.variation, item.slides)
+    item.slides = None
+    METRICS.incr("previews")
+    return item
+
+def journal_error(stage_name, item, error):
+    JOURNAL.mark_error(item.row_index, item.variation or 0, f"{stage_name}: {error}")
+
+def build_pipeline(sheet, temperature, batch_results=None):
+    concurrency = config.get("pipeline", {}).get("concurrency", {})
+    return Pipeline([
+        Stage("texts", partial(generate_texts_stage, sheet=sheet, temperature=temperature, batch_results=batch_results),
+              concurrency=concurrency.get("texts", 2), fan_out=True),
+        Stage("backgrounds", backgrounds_stage, concurrency=concurrency.get("backgrounds", 4)),
+        # In-process rendering holds the GIL, more threads only help with a worker pool
+        Stage("render", render_stage, concurrency=concurrency.get("render", RENDERER.workers)),
+        Stage("upload", upload_stage, concurrency=concurrency.get("upload", 2)),
+        Stage("record", partial(record_stage, temperature=temperature), concurrency=1),
+    ], queue_size=config.get("pipeline", {}).get("queue_size", 4), on_error=journal_error)
+
+def build_preview_pipeline(sheet, temperature, collector, scale, batch_results=None):
+    """Texts and backgrounds as usual, then small renders into per-row contact sheets: no Drive or Sheets writes."""
+    concurrency = config.get("pipeline", {}).get("concurrency", {})
+    return Pipeline([
+        Stage("texts", partial(generate_texts_stage, sheet=sheet, temperature=temperature, batch_results=batch_results),
+              concurrency=concurrency.get("texts", 2), fan_out=True),
+        Stage("backgrounds", backgrounds_stage, concurrency=concurrency.get("backgrounds", 4)),
+        # Previews render in-process, extra threads would only contend for the GIL
+        Stage("preview_render", partial(preview_render_stage, scale=scale), concurrency=1),
+        Stage("contact_sheet", partial(preview_stage, collector=collector), concurrency=1),
+    ], queue_size=config.get("pipeline", {}).get("queue_size", 4), on_error=journal_error)
+
+def main(new_run=False, preview=False):
+    global JOURNAL
+    removed = cleanup_temp_dir("temp", config.get("temp_max_age_hours", 24) * 3600)
+    if removed:
+        print(f"🧹 Removed {removed} stale temp artifact(s)")
+    # Rows and every prompt cell in one batchGet, reused by all rows
+    sheet = SheetSnapshot(SHEET_ID, 'Sheet1', refresh_interval=config.get("sheet_refresh_seconds") or None).load()
+    sheet_rows = sheet.rows
+    temperature = float(sheet.prompt('Prompts!G2'))
+    # Incremental refresh of the background folder listings, once per run
+    DRIVE_INDEX.sync()
+    # Fonts folder is listed once per run, fonts are fetched only when changed on Drive
+    FONT_STORE.resolve(
+        lambda file_id, md5, mime_type, name: download_image_from_drive(
+            file_id, "temp", 0, is_font=True, md5=md5, mime_type=mime_type, name=name
+        )
+    )
+    RENDERER.warm_fonts(FONT_STORE.paths)
+    # Fork the render workers while this is still the only thread
+    RENDERER.start()
 
     if NUM_DATA_ROWS == 'all':
         limit = len(sheet_rows)
     else:
         limit = int(NUM_DATA_ROWS)  # ensure it's an integer
 
-    # for index, row in enumerate(sheet_rows):
-    for index, row in enumerate(sheet_rows[:limit]):
-        if row:  # skip empty rows
-
-             # Continue with rest of the script...
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            temp_dir = f"temp/carousel_{timestamp}"
-            os.makedirs(temp_dir, exist_ok=True)
-            raw_dir = os.path.join("temp", "raw")
-            os.makedirs(raw_dir, exist_ok=True)
-            font_path = download_first_font_from_folder(FONTS_FOLDER_ID, temp_dir)
-
-            SLIDE_TEXTS = []
-            for array in row:
-                slide_text = array.strip()  # get the first column
-                SLIDE_TEXTS.append(slide_text)
-            print(f"{SLIDE_TEXTS}")
-
-
-            sheet_id = '1O6lNd7gIEnI_K8GxNFYSUj9WVKtveU1mwWIVgL0g7J8'
-            non_hook_prompt_template = get_prompt_from_sheet(sheet_id, 'Prompts!C2')
-            hook_prompt_template = get_prompt_from_sheet(sheet_id, 'Prompts!A2')
-            caption_template = get_prompt_from_sheet(sheet_id, 'Prompts!E2')
-
-
-            CAROUSELS = generate_variations(temperature, non_hook_prompt_template, hook_prompt_template, SLIDE_TEXTS, NUM_VARIATIONS, 100)
-            CAPTION = generate_caption(temperature, SLIDE_TEXTS, caption_template,150)
-      
-
-            test_texts.append(CAROUSELS)
-            if len(CAROUSELS) != NUM_VARIATIONS + 1:
-                print(f"variations not complete")
-                exit()
-
-            for i in range(1, len(CAROUSELS)):
-                local_image_paths = []
-
-                print(f"Variation: {i + 1}")
-          
-                slide_texts = CAROUSELS[i]
-
-                next_id = get_next_id()
-
-                timestamp = datetime.now().strftime("%Y-%m-%d %H.%M.%S")
-                subfolder_name = f"ID:{next_id}-carousel-{timestamp}"
-                # Convert dict values to a list
-                folder_ids = list(GDRIVE_TIKTOK_ACCOUNT_FOLDER_IDS.values())
-
-                # Access value by index, e.g., index 2
-                parent_folder_id = folder_ids[i]
-
-
-                for j, folder_id in enumerate(FOLDER_IDS):
-                    print(f"Folder: {j + 1}")
-
-
-                    if folder_id and folder_id.strip():
-                        images = get_images_from_folder(folder_id.strip(), max_images=100)
-                        if images:
-                            img_file = random.choice(images)
-                            img_path = download_image_from_drive(img_file['id'], raw_dir, j)
-                            local_image_paths.append(img_path)
-                        else:
-                            print(f"❌ No image found in folder {folder_id}")
-                            local_image_paths.append(None)
-                    else:
-                        print(f"⚠️ Empty folder ID for slide {j+1}")
-                        local_image_paths.append(None)
-
-                # try:
-                destination_folder_id = create_drive_folder(subfolder_name, parent_folder_id)
-                output_dir = process_carousel(
-                    LAYOUT,
-                    local_image_paths,
-                    font_path,
-                    config,
-                    FONT_COLORS,
-                    slide_texts
-                )
-                cost = 0
-                upload_images_to_drive(destination_folder_id, output_dir)
-                add_carousel_to_gsheet(slide_texts, f"{next_id}", CAPTION, temperature, cost)
-
-                print(f"✅ Uploading Image: {j+1} to folder: {i+1}")
+    if preview:
+        # A preview never resumes a real run nor marks its rows done
+        JOURNAL = RunJournal(":memory:")
+    run_id, resumed = JOURNAL.start_run(SHEET_ID, new=new_run)
+    if preview:
+        print(f"🔎 Preview run: slides at {preview_settings(config)[0]:g}x, nothing is uploaded or written to the sheet")
+    else:
+        print(f"📒 {'Resuming' if resumed else 'Starting'} run {run_id} (status: python main.py status {run_id})")
+
+    batch_results = None
+    if config.get("llm_mode", "interactive") == "batch":
+        # Generate every row's texts through one Batch API job before rendering starts
+        batch_rows = [(index, [cell.strip() for cell in row]) for index, row in enumerate(sheet_rows[:limit]) if row]
+        batch_results = generate_rows_batch(
+            get_openai_client(), MODEL, temperature,
+            sheet.prompt('Prompts!C2'),
+            sheet.prompt('Prompts!A2'),
+            sheet.prompt('Prompts!E2'),
+            batch_rows, NUM_VARIATIONS, COST,
+            max_tokens=100, caption_max_tokens=150,
+            poll_seconds=config.get("llm_batch_poll_seconds", 30),
+            cache=LLM_CACHE,
+            fallback=config.get("llm_batch_fallback", False)
+        )
 
-                # except Exception as e:
-                #     print(f"❌ Error processing carousel: {e}")
+    def rows():
+        # Fetch rows stage: the snapshot is read lazily as the text stage has room
+        for index, row in enumerate(sheet_rows[:limit]):
+            if row:  # skip empty rows
+                # Prompts come from the snapshot, reloaded only after sheet_refresh_seconds
+                sheet.maybe_refresh()
+                yield CarouselItem(index, row, row_hash=row_hash(row))
+
+    if preview:
+        scale, preview_dir, quality = preview_settings(config)
+        collector = PreviewCollector(preview_dir, NUM_VARIATIONS, quality)
+        pipeline = build_preview_pipeline(sheet, temperature, collector, scale, batch_results).run_sync(rows())
+        collector.flush()
+        print("\n=== Pipeline summary ===")
+        print(pipeline.summary())
+        print(f"🔎 {len(collector.written)} contact sheet(s) in {preview_dir}/")
+        return
+
+    # Row N+1's LLM calls overlap row N's downloads, renders and uploads
+    pipeline = build_pipeline(sheet, temperature, batch_results).run_sync(rows())
+    print("\n=== Pipeline summary ===")
+    print(pipeline.summary())
+
+    # Rows are journaled as recorded when they reach the sheet, so flush before closing the run
+    OUTPUT_WRITER.flush()
+    if not pipeline.failures:
+        JOURNAL.finish_run()
+        print(f"📒 Run {run_id} finished")
+    else:
+        print(f"📒 Run {run_id} left unfinished, the next run resumes it (python main.py new-run starts over)")
 
-  
 if __name__ == "__main__":
     os.makedirs("temp", exist_ok=True)
+    metrics_config = config.get("metrics", {})
+    METRICS.configure_profile(metrics_config.get("profile_stage"), metrics_config.get("profile_mode", "cprofile"))
     try:
-        main()
+        if sys.argv[1:] == ["warm-phone-cache"]:
+            warm_phone_cache()
+        elif sys.argv[1:] == ["rebuild-drive-index"]:
+            DRIVE_INDEX.rebuild()
+        elif sys.argv[1:2] == ["status"]:
+            print(JOURNAL.status(int(sys.argv[2]) if len(sys.argv) > 2 else None))
+        elif sys.argv[1:] == ["new-run"]:
+            main(new_run=True)
+        elif sys.argv[1:] == ["preview"]:
+            main(preview=True)
+        else:
+            main()
     finally:
+        OUTPUT_WRITER.flush()
+        RENDERER.shutdown()
+        UPLOADER.shutdown()
         print("\n=== OpenAI cost summary ===")
         print(COST.summary())
+        print("\n=== Download cache summary ===")
+        print(DOWNLOAD_CACHE.summary())
+        print("\n=== Drive upload summary ===")
+        print(UPLOADER.summary())
+        if not RENDERER.parallel:
+            # Worker processes keep their own background caches
+            print(background_cache_info())
+            print(f"Render plan cache: {plan_cache_info()}")
+        print(sprite_cache_info(config, RENDERER.sprite_cache_usage(config)))
+        print("\n=== Google client summary ===")
+        print(CLIENT_STATS.summary())
+        print("\n=== Stage timings ===")
+        print(METRICS.report())
+        profile = METRICS.profile_report()
+        if profile:
+            print("\n=== Profile ===")
+            print(profile)
+        if metrics_config.get("export"):
+            METRICS.export(metrics_config["export"])
 
@@ -0,0 +1,88 @@
+import hashlib
+import io
+import math
+import os
+import time
+from PIL import Image, ImageOps
+from modules.utils import BytesLRU, file_sha256
+from modules.metrics import METRICS
+
+# A fitted 1080x1920 RGBA background is ~8 MB, so the default holds about 30
+BACKGROUND_CACHE_MB = 256
+
+_cache = None
+
+
+def open_image(source):
+    """Open an image given as a file path or as the encoded bytes themselves."""
+    if isinstance(source, (bytes, bytearray)):
+        return Image.open(io.BytesIO(source))
+    return Image.open(source)
+
+def has_image(source):
+    if isinstance(source, (bytes, bytearray)):
+        return len(source) > 0
+    return bool(source) and os.path.exists(source)
+
+def source_hash(source):
+    if isinstance(source, (bytes, bytearray)):
+        return hashlib.sha256(source).hexdigest()
+    return file_sha256(source)
+
+def get_background_cache(config=None):
+    """Per-process cache of fitted backgrounds, sized from background_cache_mb on first use."""
+    global _cache
+    if _cache is None:
+        max_mb = (config or {}).get("background_cache_mb", BACKGROUND_CACHE_MB)
+        _cache = BytesLRU(int(max_mb) * 1024 ** 2)
+    return _cache
+
+def draft_size(src_size, dst_size):
+    """Smallest decode size whose ImageOps.fit crop still covers dst_size."""
+    src_w, src_h = src_size
+    dst_w, dst_h = dst_size
+    scale = max(dst_w / src_w, dst_h / src_h)
+    return math.ceil(src_w * scale), math.ceil(src_h * scale)
+
+def decode_fitted(source, size):
+    """Decode source at the smallest JPEG scale (1/2, 1/4, 1/8) still at or above size, then fit and convert to RGBA."""
+    img = open_image(source)
+    src_size = img.size
+    if img.format == "JPEG":
+        img.draft("RGB", draft_size(src_size, size))
+    decoded_size = img.size
+    img = ImageOps.fit(img, size, Image.Resampling.LANCZOS, centering=(0.5, 0.5))
+    return img.convert("RGBA"), src_size, decoded_size
+
+def load_background(source, size, config=None):
+    """
+    Fitted RGBA background for source at size, plus a one-line report of how it was obtained.
+
+    Results are cached by (content hash, size); callers must not modify the returned image.
+    """
+    cache = get_background_cache(config)
+    start = time.perf_counter()
+    key = (source_hash(source), tuple(size))
+    img = cache.get(key)
+    if img is not None:
+        elapsed = (time.perf_counter() - start) * 1000
+        return img, f"cache hit in {elapsed:.1f} ms ({_usage(cache)})"
+
+    with METRICS.timer("decode_fit"):
+        img, src_size, decoded_size = decode_fitted(source, size)
+    cache.put(key, img, img.width * img.height * len(img.getbands()))
+    elapsed = (time.perf_counter() - start) * 1000
+    return img, (
+        f"decoded {src_size[0]}x{src_size[1]} at {decoded_size[0]}x{decoded_size[1]} "
+        f"in {elapsed:.1f} ms ({_usage(cache)})"
+    )
+
+def _usage(cache):
+    return f"cache {len(cache)} bg, {cache.current_bytes / 1024 ** 2:.1f}/{cache.max_bytes / 1024 ** 2:.0f} MB"
+
+def background_cache_info():
+    cache = get_background_cache()
+    return (
+        f"Background cache: {cache.hits} hits, {cache.misses} misses, {cache.evictions} evictions, "
+        f"{cache.current_bytes / 1024 ** 2:.1f} MB in use"
+    )
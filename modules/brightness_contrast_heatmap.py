@@ -1 +1,98 @@
-brightness_contrast_heatmap.py
\ No newline at end of file
+import numpy as np
+
+# Backgrounds are analysed at 1/ANALYSIS_SCALE resolution; a 1080x1920 slide becomes 270x480
+ANALYSIS_SCALE = 4
+# Candidate text positions are this many (full resolution) pixels apart
+Y_STEP = 8
+# Score = contrast with the text colour - BUSY_WEIGHT * local std - CENTER_WEIGHT * distance from centre
+BUSY_WEIGHT = 1.5
+CENTER_WEIGHT = 0.1
+
+
+def relative_luminance(rgb):
+    r, g, b = (c / 255 for c in rgb[:3])
+    return 0.299 * r + 0.587 * g + 0.114 * b
+
+def integral_image(values):
+    """Summed-area table with a leading zero row and column, so any box sum is four lookups."""
+    table = np.zeros((values.shape[0] + 1, values.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(values, axis=0), axis=1, out=table[1:, 1:])
+    return table
+
+def box_sums(table, tops, lefts, bottoms, rights):
+    """Sums over boxes [top, bottom) x [left, right) for arrays of boxes at once."""
+    return table[bottoms, rights] - table[tops, rights] - table[bottoms, lefts] + table[tops, lefts]
+
+
+class LuminanceHeatmap:
+    """
+    Local luminance mean and contrast (standard deviation) of an image, for any box in O(1).
+
+    Built from integral images of luminance and squared luminance on a
+    downscaled copy, so scoring hundreds of candidate text boxes costs a few
+    array lookups each.
+    """
+
+    def __init__(self, img, scale=ANALYSIS_SCALE):
+        self.scale = scale
+        self.size = img.size
+        small = img.convert("L").reduce(scale) if scale > 1 else img.convert("L")
+        luminance = np.asarray(small, dtype=np.float64) / 255
+        self.shape = luminance.shape
+        self._sum = integral_image(luminance)
+        self._sum_sq = integral_image(luminance * luminance)
+
+    def _to_grid(self, values, limit):
+        return np.clip(np.asarray(values) // self.scale, 0, limit).astype(np.intp)
+
+    def box_stats(self, boxes):
+        """(mean, std) luminance arrays for an (N, 4) array of full-resolution (left, top, right, bottom) boxes."""
+        boxes = np.asarray(boxes)
+        height, width = self.shape
+        lefts = self._to_grid(boxes[:, 0], width)
+        tops = self._to_grid(boxes[:, 1], height)
+        rights = np.maximum(self._to_grid(boxes[:, 2], width), lefts + 1)
+        bottoms = np.maximum(self._to_grid(boxes[:, 3], height), tops + 1)
+        rights = np.minimum(rights, width)
+        bottoms = np.minimum(bottoms, height)
+        area = (rights - lefts) * (bottoms - tops)
+        mean = box_sums(self._sum, tops, lefts, bottoms, rights) / area
+        mean_sq = box_sums(self._sum_sq, tops, lefts, bottoms, rights) / area
+        return mean, np.sqrt(np.maximum(mean_sq - mean * mean, 0))
+
+
+def score_positions(heatmap, safe_box, block_width, block_height, fill, step=Y_STEP, avoid_boxes=()):
+    """
+    Score every top y for a horizontally centred text block inside safe_box.
+
+    Returns (ys, scores); positions overlapping any of avoid_boxes score -inf.
+    """
+    safe_left, safe_top, safe_right, safe_bottom = safe_box
+    last_top = max(safe_top, safe_bottom - block_height)
+    ys = np.arange(safe_top, last_top + 1, step)
+    left = safe_left + max(0, (safe_right - safe_left - block_width) // 2)
+    right = min(safe_right, left + block_width)
+    boxes = np.stack([
+        np.full_like(ys, left), ys, np.full_like(ys, right), ys + block_height
+    ], axis=1)
+
+    mean, std = heatmap.box_stats(boxes)
+    contrast = np.abs(relative_luminance(fill) - mean)
+    centered = (safe_top + safe_bottom - block_height) / 2
+    off_center = np.abs(ys - centered) / max(1, safe_bottom - safe_top)
+    scores = contrast - BUSY_WEIGHT * std - CENTER_WEIGHT * off_center
+
+    for x1, y1, x2, y2 in avoid_boxes:
+        overlaps = (ys < y2) & (ys + block_height > y1) & (left < x2) & (right > x1)
+        scores[overlaps] = -np.inf
+    return ys, scores
+
+def best_text_y(img, safe_box, block_width, block_height, fill=(255, 255, 255), avoid_boxes=(), heatmap=None):
+    """Most legible top y for the text block, or None if every position overlaps an avoided box."""
+    if heatmap is None:
+        heatmap = LuminanceHeatmap(img)
+    ys, scores = score_positions(heatmap, safe_box, block_width, block_height, fill, avoid_boxes=avoid_boxes)
+    best = int(np.argmax(scores))
+    if not np.isfinite(scores[best]):
+        return None
+    return int(ys[best])
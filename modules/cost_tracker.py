@@ -0,0 +1,145 @@
+import threading
+from decimal import Decimal
+from typing import Optional
+
+# Batch API requests are billed at half the interactive rate
+BATCH_DISCOUNT = Decimal("0.5")
+
+
+def _field(obj, name):
+    # Interactive responses are SDK objects, Batch API results are plain dicts
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+class CostTracker:
+
+    def __init__(self):
+        # add() is called from concurrent LLM workers
+        self._lock = threading.Lock()
+        self.total_prompt_tokens = 0
+        self.total_completion_tokens = 0
+        self.total_cached_prompt_tokens = 0  # if prompt caching is used
+        self.total_calls = 0
+        self.total_batch_calls = 0
+        self.total_cached_calls = 0  # answers replayed from the local response cache
+        self.total_usd = Decimal("0")
+
+    def add(self, response, model_name: str, batch: bool = False):
+        with self._lock:
+            self._add(response, model_name, batch)
+
+    def add_cached(self, count: int = 1):
+        with self._lock:
+            self.total_cached_calls += count
+
+    def _add(self, response, model_name: str, batch: bool):
+        self.total_calls += 1
+        if batch:
+            self.total_batch_calls += 1
+        usage = _field(response, "usage")
+        if not usage:
+            return  # nothing to add
+
+        prompt_tokens = int(_field(usage, "prompt_tokens") or 0)
+        completion_tokens = int(_field(usage, "completion_tokens") or 0)
+
+        # Some responses include caching details
+        cached = 0
+        details = _field(usage, "prompt_tokens_details")
+        if details:
+            cached = int(_field(details, "cached_tokens") or 0)
+
+        self.total_prompt_tokens += prompt_tokens
+        self.total_completion_tokens += completion_tokens
+        self.total_cached_prompt_tokens += cached
+
+        rates = PRICES_PER_1K.get(model_name, None)
+        if not rates:
+            return  # unknown model rate, skip cost math to avoid wrong totals
+
+        # Split cached vs non cached prompt tokens when a cached rate exists
+        cached_rate: Optional[Decimal] = rates.get("cached_input")
+        if cached_rate is not None and cached > 0:
+            uncached_prompt = max(prompt_tokens - cached, 0)
+            cost_input = (Decimal(uncached_prompt) * rates["input"] +
+                          Decimal(cached) * cached_rate) / Decimal(1000)
+        else:
+            cost_input = (Decimal(prompt_tokens) * rates["input"]) / Decimal(1000)
+
+        cost_output = (Decimal(completion_tokens) * rates["output"]) / Decimal(1000)
+        cost = cost_input + cost_output
+        if batch:
+            cost *= BATCH_DISCOUNT
+        self.total_usd += cost
+
+    def summary(self) -> str:
+        with self._lock:
+            return self._summary()
+
+    def _summary(self) -> str:
+        return (
+            f"API calls: {self.total_calls} (batch: {self.total_batch_calls})\n"
+            f"Cached responses replayed: {self.total_cached_calls} ($0)\n"
+            f"Prompt tokens: {self.total_prompt_tokens} "
+            f"(cached: {self.total_cached_prompt_tokens})\n"
+            f"Completion tokens: {self.total_completion_tokens}\n"
+            f"Total cost: ${self.total_usd.quantize(Decimal('0.0001'))} USD"
+        )
+
+COST = CostTracker()
+
+PRICES_PER_1K = {
+    "gpt-3.5-turbo": {
+        "input":  Decimal("0.0015"),   # $1.50 per 1M tokens
+        "output": Decimal("0.0020"),   # $2.00 per 1M tokens
+        "cached_input": None
+    },
+    "gpt-3.5-turbo-16k": {
+        "input":  Decimal("0.0030"),   # $3.00 per 1M
+        "output": Decimal("0.0040"),   # $4.00 per 1M
+        "cached_input": None
+    },
+    "gpt-3.5-turbo-0613": {
+        "input":  Decimal("0.0015"),
+        "output": Decimal("0.0020"),
+        "cached_input": None
+    },
+    # For classic davinci, curie, etc. if needed
+    "text-davinci-003": {
+        "input":  Decimal("0.02"),     # $20 per 1M
+        "output": Decimal("0.02"),
+        "cached_input": None
+    },
+    "text-curie-001": {
+        "input":  Decimal("0.002"),    # $2 per 1M
+        "output": Decimal("0.002"),
+        "cached_input": None
+    },
+    "text-babbage-001": {
+        "input":  Decimal("0.0005"),
+        "output": Decimal("0.0005"),
+        "cached_input": None
+    },
+    "text-ada-001": {
+        "input":  Decimal("0.0004"),
+        "output": Decimal("0.0004"),
+        "cached_input": None
+    },
+    # Your existing GPT-4 and GPT-4o entries below
+    "gpt-4": {
+        "input":  Decimal("0.03"),
+        "output": Decimal("0.06"),
+        "cached_input": None
+    },
+    "gpt-4o": {
+        "input":  Decimal("0.005"),
+        "output": Decimal("0.02"),
+        "cached_input": Decimal("0.0025")
+    },
+    "gpt-4o-mini": {
+        "input":  Decimal("0.0006"),
+        "output": Decimal("0.0024"),
+        "cached_input": Decimal("0.0003")
+    },
+}
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from modules.utils import atomic_write_bytes
+
+DOWNLOAD_CACHE_DIR = "cache/downloads"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+# Files used this recently are never evicted, another worker may be about to open them
+EVICTION_GRACE_SECONDS = 600
+
+
+class DownloadCache:
+    """
+    Content-addressed cache of Drive downloads keyed by file ID + md5Checksum.
+
+    Entries are immutable, written atomically (temp file + rename) so concurrent
+    workers never read half a file, and evicted least-recently-used first once
+    the directory grows past max_bytes. A hit bumps the file's mtime.
+    """
+
+    def __init__(self, cache_dir=DOWNLOAD_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_downloaded = 0
+        self.bytes_served = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        max_mb = config.get("download_cache_max_mb")
+        return cls(max_bytes=int(max_mb) * 1024 ** 2 if max_mb else DEFAULT_MAX_BYTES)
+
+    def path_for(self, file_id, version, ext):
+        return os.path.join(self.cache_dir, f"{file_id}_{version}{ext}")
+
+    def lookup(self, file_id, version, ext):
+        """Cached path for this exact file version, or None. Counts a hit or miss."""
+        path = self.path_for(file_id, version, ext)
+        try:
+            os.utime(path)
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_served += size
+        return path
+
+    def store(self, file_id, version, ext, data):
+        path = self.path_for(file_id, version, ext)
+        atomic_write_bytes(path, data)
+        with self._lock:
+            self.bytes_downloaded += len(data)
+        self.evict()
+        return path
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(".tmp_"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+
+        now = time.time()
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes or now - mtime < EVICTION_GRACE_SECONDS:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        return (
+            f"Lookups: {lookups} (hits: {self.hits}, misses: {self.misses}, hit rate: {hit_rate:.1f}%)\n"
+            f"Downloaded: {self.bytes_downloaded / 1024 ** 2:.1f} MB, "
+            f"served from cache: {self.bytes_served / 1024 ** 2:.1f} MB\n"
+            f"Evictions: {self.evictions}"
+        )
@@ -1,23 +1,10 @@
 import os
-from googleapiclient.discovery import build
-from google.oauth2.service_account import Credentials
-from googleapiclient.http import MediaFileUpload
+from modules.google_clients import get_drive_service
+from modules.upload_engine import get_upload_engine
 
-SCOPES = ['https://www.googleapis.com/auth/drive']
-
-def upload_folder_to_drive(folder_path, parent_id):
-    creds = Credentials.from_service_account_file('credentials.json', scopes=SCOPES)
-    service = build('drive', 'v3', credentials=creds)
-
-    # Map file extensions to MIME types
-    ext_to_mime = {
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.png': 'image/png',
-        '.gif': 'image/gif',
-        '.bmp': 'image/bmp',
-        '.tiff': 'image/tiff'
-    }
+def upload_folder_to_drive(folder_path, parent_id, engine=None):
+    service = get_drive_service()
+    engine = engine or get_upload_engine()
 
     try:
         # Create a folder in the Shared Drive
@@ -34,30 +21,19 @@ def upload_folder_to_drive(folder_path, parent_id):
         folder_id = folder.get('id')
         print(f"✅ Created folder {folder_id} in Shared Drive")
 
-        # Upload each file in the folder
-        for file_name in os.listdir(folder_path):
-            file_path = os.path.join(folder_path, file_name)
-            if os.path.isfile(file_path):
-                # Get MIME type based on file extension
-                file_ext = os.path.splitext(file_name)[1].lower()
-                mime_type = ext_to_mime.get(file_ext, 'application/octet-stream')
-                
-                file_metadata = {
-                    'name': file_name,
-                    'parents': [folder_id]
-                }
-                media = MediaFileUpload(file_path, mimetype=mime_type)
-                service.files().create(
-                    body=file_metadata,
-                    media_body=media,
-                    fields='id',
-                    supportsAllDrives=True
-                ).execute()
-                print(f"✅ Uploaded {file_name} to folder {folder_id}")
+        # Upload every file in the folder through the shared upload engine
+        file_paths = [
+            os.path.join(folder_path, name) for name in sorted(os.listdir(folder_path))
+            if os.path.isfile(os.path.join(folder_path, name))
+        ]
+        file_ids = engine.upload_files(folder_id, file_paths)
+        failed = [os.path.basename(p) for p, file_id in zip(file_paths, file_ids) if file_id is None]
+        if failed:
+            raise RuntimeError(f"{len(failed)} file(s) failed to upload: {', '.join(failed)}")
 
         print(f"✅ Uploaded {folder_path} to Google Drive")
         return folder_id
 
     except Exception as e:
         print(f"❌ Error uploading folder {folder_path}: {str(e)}")
-        raise
\ No newline at end of file
+        raise
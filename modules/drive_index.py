@@ -0,0 +1,143 @@
+import json
+import os
+import random
+import threading
+from modules.google_clients import get_drive_service
+from modules.utils import atomic_write_text
+from modules.metrics import METRICS
+
+DRIVE_INDEX_PATH = "cache/drive_index.json"
+FILE_FIELDS = "id, name, mimeType, md5Checksum, modifiedTime, parents, trashed"
+INDEXED_FIELDS = ("id", "name", "mimeType", "md5Checksum", "modifiedTime")
+PAGE_SIZE = 1000
+
+
+def _entry(file):
+    return {field: file.get(field) for field in INDEXED_FIELDS}
+
+def _is_image(file):
+    return (file.get("mimeType") or "").startswith("image/")
+
+
+class DriveFolderIndex:
+    """
+    Local index of the images in a set of Drive folders.
+
+    Filled once with a fully paginated listing, then kept current from the
+    Drive changes feed, so picking a background needs no list call. State is
+    persisted to cache/drive_index.json between runs.
+    """
+
+    def __init__(self, folder_ids, path=DRIVE_INDEX_PATH):
+        self.folder_ids = [f.strip() for f in folder_ids if f and f.strip()]
+        self.path = path
+        self._lock = threading.Lock()
+        self.page_token = None
+        self.folders = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+                self.page_token = data.get("page_token")
+                self.folders = data.get("folders", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable Drive index {path}: {e}")
+
+    def save(self):
+        with self._lock:
+            data = {"page_token": self.page_token, "folders": self.folders}
+            atomic_write_text(self.path, json.dumps(data))
+
+    def _list_folder(self, folder_id):
+        drive_service = get_drive_service()
+        query = f"'{folder_id}' in parents and (mimeType contains 'image/') and trashed = false"
+        files = {}
+        page_token = None
+        while True:
+            with METRICS.timer("drive_list", folder=folder_id):
+                response = drive_service.files().list(
+                    q=query,
+                    spaces='drive',
+                    fields=f'nextPageToken, files({FILE_FIELDS})',
+                    pageSize=PAGE_SIZE,
+                    pageToken=page_token,
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True
+                ).execute()
+            for file in response.get('files', []):
+                files[file['id']] = _entry(file)
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return files
+
+    def rebuild(self, folder_ids=None):
+        """
+        Re-list folders from scratch.
+
+        With no folder_ids the whole index is replaced by fresh listings of
+        self.folder_ids, dropping folders no longer in that list.
+        """
+        drive_service = get_drive_service()
+        # Take the changes token first so edits made while listing are replayed by the next sync
+        page_token = drive_service.changes().getStartPageToken(supportsAllDrives=True).execute()['startPageToken']
+        listed = {}
+        for folder_id in folder_ids or self.folder_ids:
+            listed[folder_id] = self._list_folder(folder_id)
+            print(f"🗂️ Indexed {len(listed[folder_id])} images in folder {folder_id}")
+        with self._lock:
+            if folder_ids:
+                self.folders.update(listed)
+            else:
+                self.folders = listed
+        if not folder_ids or self.page_token is None:
+            self.page_token = page_token
+        self.save()
+
+    def _apply_change(self, change):
+        file_id = change.get('fileId')
+        file = change.get('file') or {}
+        with self._lock:
+            for files in self.folders.values():
+                files.pop(file_id, None)
+            if change.get('removed') or file.get('trashed') or not _is_image(file):
+                return
+            for parent in file.get('parents', []):
+                if parent in self.folders:
+                    self.folders[parent][file_id] = _entry(file)
+
+    def sync(self):
+        """Bring the index up to date: full listing for new folders, changes feed for the rest."""
+        missing = [f for f in self.folder_ids if f not in self.folders]
+        if self.page_token is None:
+            self.rebuild()
+            return
+        if missing:
+            self.rebuild(missing)
+
+        drive_service = get_drive_service()
+        page_token = self.page_token
+        applied = 0
+        while page_token:
+            with METRICS.timer("drive_list", feed="changes"):
+                response = drive_service.changes().list(
+                    pageToken=page_token,
+                    fields=f'nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}))',
+                    pageSize=PAGE_SIZE,
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True
+                ).execute()
+            for change in response.get('changes', []):
+                self._apply_change(change)
+                applied += 1
+            if 'newStartPageToken' in response:
+                self.page_token = response['newStartPageToken']
+            page_token = response.get('nextPageToken')
+        print(f"🗂️ Drive index synced ({applied} change(s) applied)")
+        self.save()
+
+    def images(self, folder_id):
+        return list(self.folders.get(folder_id.strip(), {}).values())
+
+    def random_image(self, folder_id):
+        images = self.images(folder_id)
+        return random.choice(images) if images else None
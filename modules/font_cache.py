@@ -0,0 +1,29 @@
+import io
+from functools import lru_cache
+from PIL import ImageFont
+
+# Enough for a few fonts across the whole 60..120px fitting range
+FONT_CACHE_SIZE = 256
+
+# Font files read into memory once, get_font parses from these bytes
+_font_bytes = {}
+
+
+def preload_font(font_path):
+    if font_path not in _font_bytes:
+        with open(font_path, "rb") as f:
+            _font_bytes[font_path] = f.read()
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(font_path, font_size):
+    """Process-wide cache of parsed TTF objects keyed by (path, size), LRU evicted."""
+    data = _font_bytes.get(font_path)
+    if data is not None:
+        return ImageFont.truetype(io.BytesIO(data), font_size)
+    return ImageFont.truetype(font_path, font_size)
+
+def font_cache_info():
+    return get_font.cache_info()
+
+def clear_font_cache():
+    get_font.cache_clear()
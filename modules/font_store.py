@@ -0,0 +1,103 @@
+import json
+import os
+import random
+import threading
+from modules.font_cache import preload_font
+from modules.google_clients import get_drive_service
+from modules.utils import atomic_write_text
+
+FONT_MANIFEST_PATH = "cache/fonts.json"
+FONT_EXTENSIONS = ('.ttf', '.otf')
+
+
+class FontStore:
+    """
+    Fonts from the Drive fonts folder, resolved once per run.
+
+    The folder is listed once; a font is only fetched again when its Drive
+    modifiedTime differs from the manifest in cache/fonts.json. Every font is
+    preloaded into memory for get_font, and worker processes inherit it.
+    """
+
+    def __init__(self, folder_id, manifest_path=FONT_MANIFEST_PATH):
+        self.folder_id = folder_id
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+        self.fonts = []  # (name, local path), in Drive listing order
+        self.manifest = {}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r") as f:
+                    self.manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable font manifest {manifest_path}: {e}")
+
+    def _list_fonts(self):
+        drive_service = get_drive_service()
+        query = f"'{self.folder_id}' in parents and mimeType != 'application/vnd.google-apps.folder' and trashed = false"
+        files = []
+        page_token = None
+        while True:
+            response = drive_service.files().list(
+                q=query,
+                spaces='drive',
+                fields='nextPageToken, files(id, name, mimeType, md5Checksum, modifiedTime)',
+                orderBy='name',
+                pageToken=page_token,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True
+            ).execute()
+            files.extend(f for f in response.get('files', []) if f['name'].lower().endswith(FONT_EXTENSIONS))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return files
+
+    def resolve(self, download):
+        """
+        List the fonts folder and make every font available locally.
+
+        download(file_id, md5, mime_type, name) returns a local path or None; it is
+        only called for fonts that are new or changed since the last run.
+        """
+        fonts = []
+        for file in self._list_fonts():
+            known = self.manifest.get(file['id'])
+            if known and known['modifiedTime'] == file.get('modifiedTime') and os.path.exists(known['path']):
+                path = known['path']
+            else:
+                if known:
+                    print(f"🔤 Font {file['name']} changed on Drive, fetching new version")
+                path = download(file['id'], file.get('md5Checksum'), file.get('mimeType'), file['name'])
+                if not path:
+                    continue
+                self.manifest[file['id']] = {
+                    'name': file['name'],
+                    'modifiedTime': file.get('modifiedTime'),
+                    'path': path,
+                }
+            preload_font(path)
+            fonts.append((file['name'], path))
+
+        with self._lock:
+            self.fonts = fonts
+        atomic_write_text(self.manifest_path, json.dumps(self.manifest))
+        if fonts:
+            print(f"🔤 {len(fonts)} font(s) ready: {', '.join(name for name, _ in fonts)}")
+        else:
+            print("⚠️ No TTF/OTF font found in folder")
+        return self.fonts
+
+    @property
+    def paths(self):
+        return [path for _, path in self.fonts]
+
+    def choose(self, selection="first"):
+        """Font path for a carousel: the first font in the folder, or a random one."""
+        if not self.fonts:
+            return None
+        if selection == "random":
+            return random.choice(self.fonts)[1]
+        for name, path in self.fonts:
+            if name == selection:
+                return path
+        return self.fonts[0][1]
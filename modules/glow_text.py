@@ -0,0 +1,120 @@
+import math
+from PIL import Image, ImageDraw, ImageFilter, ImageColor
+
+
+def _to_rgb(color):
+    if isinstance(color, str):
+        return ImageColor.getrgb(color)[:3]
+    return tuple(color[:3])
+
+def glow_margin(glow_radius, blur_radius):
+    """Pixels the glow can reach beyond the text ink: dilation plus the blur tail."""
+    return glow_radius + int(math.ceil(3 * blur_radius)) + 2
+
+def dilate_mask(mask, radius):
+    """Square dilation of an "L" mask, same footprint as drawing the text at every (dx, dy) offset."""
+    # Stacking 3x3 max filters grows the square by 2px per pass, which is far
+    # cheaper than a single (2r+1)x(2r+1) MaxFilter.
+    for _ in range(radius):
+        mask = mask.filter(ImageFilter.MaxFilter(3))
+    return mask
+
+def text_block_bbox(lines, font):
+    """Union ink bbox of [((x, y), text), ...] in canvas coordinates."""
+    boxes = [font.getbbox(text) for _, text in lines]
+    left = min(x + b[0] for ((x, _), _), b in zip(lines, boxes))
+    top = min(y + b[1] for ((_, y), _), b in zip(lines, boxes))
+    right = max(x + b[2] for ((x, _), _), b in zip(lines, boxes))
+    bottom = max(y + b[3] for ((_, y), _), b in zip(lines, boxes))
+    return left, top, right, bottom
+
+def render_glow_layer(size, lines, font, glow_color="#FF4EDB", glow_radius=10, blur_radius=8):
+    """
+    Build the blurred glow for all lines, cropped to the ink bbox plus the blur margin.
+
+    Returns (layer, (left, top)) where layer is an RGBA image to composite at that
+    offset, or (None, None) if nothing would be visible on a canvas of `size`.
+    """
+    width, height = size
+    x0, y0, x1, y1 = text_block_bbox(lines, font)
+    pad = glow_margin(glow_radius, blur_radius)
+    left, top = max(0, x0 - pad), max(0, y0 - pad)
+    right, bottom = min(width, x1 + pad), min(height, y1 + pad)
+    if right <= left or bottom <= top:
+        return None, None
+
+    size = (right - left, bottom - top)
+    return _glow_from_lines(lines, font, (left, top), size, glow_color, glow_radius, blur_radius), (left, top)
+
+def _text_mask(lines, font, offset, size):
+    # One text render per line into a single mask
+    left, top = offset
+    mask = Image.new("L", size, 0)
+    mask_draw = ImageDraw.Draw(mask)
+    for (x, y), text in lines:
+        mask_draw.text((x - left, y - top), text, font=font, fill=255)
+    return mask
+
+def _glow_from_lines(lines, font, offset, size, glow_color, glow_radius, blur_radius):
+    alpha = dilate_mask(_text_mask(lines, font, offset, size), glow_radius)
+
+    # Match the old layer exactly: colour wherever any glow pass touched, black
+    # elsewhere, so the unpremultiplied blur keeps its darker fringe.
+    touched = alpha.point(lambda v: 255 if v else 0)
+    r, g, b = _to_rgb(glow_color)
+    bands = [touched.point(lambda v, c=c: c if v else 0) for c in (r, g, b)]
+    layer = Image.merge("RGBA", bands + [alpha])
+    return layer.filter(ImageFilter.GaussianBlur(blur_radius))
+
+def render_text_sprite(lines, font, fill="white", glow_color="#FF4EDB", glow_radius=10, blur_radius=8):
+    """
+    Glow plus crisp text for all lines as one transparent RGBA sprite, uncropped by any canvas.
+
+    Returns (sprite, (left, top)): compositing the sprite at that offset gives the
+    same result as draw_soft_glow_lines, since the text is laid "over" the glow
+    inside the sprite instead of onto the background.
+    """
+    x0, y0, x1, y1 = text_block_bbox(lines, font)
+    pad = glow_margin(glow_radius, blur_radius)
+    offset = (x0 - pad, y0 - pad)
+    size = (x1 - x0 + 2 * pad, y1 - y0 + 2 * pad)
+    sprite = _glow_from_lines(lines, font, offset, size, glow_color, glow_radius, blur_radius)
+    text_layer = Image.new("RGBA", size, _to_rgb(fill) + (0,))
+    text_layer.putalpha(_text_mask(lines, font, offset, size))
+    sprite.alpha_composite(text_layer)
+    return sprite, offset
+
+def composite_sprite(base_img, sprite, offset):
+    """alpha_composite sprite onto base_img at offset, clipping whatever falls outside."""
+    left, top = offset
+    src_left, src_top = max(0, -left), max(0, -top)
+    src_right = min(sprite.width, base_img.width - left)
+    src_bottom = min(sprite.height, base_img.height - top)
+    if src_right <= src_left or src_bottom <= src_top:
+        return base_img
+    base_img.alpha_composite(
+        sprite, dest=(left + src_left, top + src_top), source=(src_left, src_top, src_right, src_bottom)
+    )
+    return base_img
+
+def draw_soft_glow_lines(base_img, lines, font, fill="white", glow_color="#FF4EDB", glow_radius=10, blur_radius=8):
+    """
+    Draw several lines of glowing text in one pass.
+
+    `lines` is a list of ((x, y), text). The glow is composited once over the
+    region it covers and the crisp text is drawn on top. base_img (RGBA) is
+    drawn into in place and returned; pass a copy to keep the original.
+    """
+    lines = [(pos, text) for pos, text in lines if text]
+    if not lines:
+        return base_img
+
+    layer, offset = render_glow_layer(base_img.size, lines, font, glow_color, glow_radius, blur_radius)
+    if layer is not None:
+        base_img.alpha_composite(layer, dest=offset)
+
+    draw = ImageDraw.Draw(base_img)
+    for (x, y), text in lines:
+        draw.text((x, y), text, font=font, fill=fill)
+
+    return base_img
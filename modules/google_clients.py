@@ -0,0 +1,144 @@
+import threading
+import httplib2
+import google_auth_httplib2
+import gspread
+from google.oauth2.service_account import Credentials
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
+
+CREDENTIALS_FILE = 'credentials.json'
+# One credential set covers Drive, Sheets and gspread, so the run authenticates once
+SCOPES = [
+    'https://www.googleapis.com/auth/drive',
+    'https://www.googleapis.com/auth/spreadsheets',
+]
+
+
+class ClientStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.credential_loads = 0
+        self.credential_reuses = 0
+        self.discovery_builds = 0
+        self.discovery_builds_avoided = 0
+        self.gspread_logins = 0
+        self.gspread_logins_avoided = 0
+        self.worksheet_opens = 0
+        self.worksheet_cache_hits = 0
+        self.token_refreshes = 0
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def summary(self) -> str:
+        return (
+            f"Credential loads: {self.credential_loads} (reused: {self.credential_reuses})\n"
+            f"Discovery builds: {self.discovery_builds} (avoided: {self.discovery_builds_avoided})\n"
+            f"gspread logins: {self.gspread_logins} (avoided: {self.gspread_logins_avoided})\n"
+            f"Worksheets opened: {self.worksheet_opens} (cache hits: {self.worksheet_cache_hits})\n"
+            f"Token refreshes: {self.token_refreshes}"
+        )
+
+CLIENT_STATS = ClientStats()
+
+_lock = threading.RLock()
+_refresh_lock = threading.Lock()
+_local = threading.local()
+_credentials = None
+_services = {}
+_gspread_client = None
+_worksheets = {}
+
+
+def _count_refreshes(creds):
+    # google-auth refreshes from before_request whenever the token is missing or
+    # expired. Serialize it so concurrent threads don't each fetch a new token.
+    refresh = creds.refresh
+
+    def counted_refresh(request):
+        with _refresh_lock:
+            if creds.valid:
+                return
+            CLIENT_STATS.incr("token_refreshes")
+            refresh(request)
+
+    creds.refresh = counted_refresh
+    return creds
+
+def get_credentials():
+    global _credentials
+    with _lock:
+        if _credentials is None:
+            CLIENT_STATS.incr("credential_loads")
+            _credentials = _count_refreshes(
+                Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
+            )
+        else:
+            CLIENT_STATS.incr("credential_reuses")
+        return _credentials
+
+def _thread_http():
+    # httplib2.Http is not thread-safe: keep one authorized connection pool per thread
+    http = getattr(_local, "http", None)
+    if http is None:
+        http = google_auth_httplib2.AuthorizedHttp(get_credentials(), http=httplib2.Http())
+        _local.http = http
+    return http
+
+def _build_request(http, *args, **kwargs):
+    return HttpRequest(_thread_http(), *args, **kwargs)
+
+def get_service(name, version):
+    """Build each API client once per process; requests run on the calling thread's connection."""
+    key = (name, version)
+    with _lock:
+        service = _services.get(key)
+        if service is not None:
+            CLIENT_STATS.incr("discovery_builds_avoided")
+            return service
+        CLIENT_STATS.incr("discovery_builds")
+        service = build(name, version, http=_thread_http(), requestBuilder=_build_request, cache_discovery=False)
+        _services[key] = service
+        return service
+
+def get_drive_service():
+    return get_service('drive', 'v3')
+
+def get_sheets_service():
+    return get_service('sheets', 'v4')
+
+def get_gspread_client():
+    global _gspread_client
+    with _lock:
+        if _gspread_client is None:
+            CLIENT_STATS.incr("gspread_logins")
+            _gspread_client = gspread.authorize(get_credentials())
+        else:
+            CLIENT_STATS.incr("gspread_logins_avoided")
+        return _gspread_client
+
+def get_worksheet(spreadsheet_id, title):
+    """Opened gspread worksheet, cached so open_by_key/worksheet lookups happen once."""
+    key = (spreadsheet_id, title)
+    with _lock:
+        worksheet = _worksheets.get(key)
+        if worksheet is None:
+            CLIENT_STATS.incr("worksheet_opens")
+            worksheet = get_gspread_client().open_by_key(spreadsheet_id).worksheet(title)
+            _worksheets[key] = worksheet
+        else:
+            CLIENT_STATS.incr("worksheet_cache_hits")
+        return worksheet
+
+def override_service(name, version, service):
+    """Serve `service` for get_service(name, version) from now on (benchmarks, offline runs)."""
+    with _lock:
+        _services[(name, version)] = service
+
+def override_gspread_client(gspread_client):
+    global _gspread_client
+    with _lock:
+        _gspread_client = gspread_client
+        _worksheets.clear()
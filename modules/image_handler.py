@@ -1,13 +1,21 @@
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
+from PIL import Image, ImageDraw
 import textwrap
+import io
 import os
+import tempfile
+import threading
 from datetime import datetime
 import yaml
 import requests
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
-import ultralytics
-from ultralytics import YOLO
+from modules.glow_text import draw_soft_glow_lines
+from modules.font_cache import get_font
+from modules.render_plan import compile_plan, rasterize
+from modules.preview import preview_settings, save_contact_sheet
+from modules.background_cache import open_image, has_image, load_background
+from modules.brightness_contrast_heatmap import best_text_y
+from modules.metrics import METRICS
 
 def get_tiktok_safe_area(image_width, image_height):
     # These values are approximate and can be tweaked per device
@@ -30,21 +38,86 @@ def draw_safe_area_outline(image, safe_box):
     draw.rectangle(safe_box, outline="red", width=4)
     return image
 
+PHONE_MODEL_PATH = "yolov8n.pt"  # Make sure this model file is downloaded
+
+# ultralytics pulls in torch, so the detector is only imported and loaded on first use
+_phone_detector = None
+_phone_detector_lock = threading.Lock()
+
+def get_phone_detector():
+    global _phone_detector
+    if _phone_detector is None:
+        with _phone_detector_lock:
+            if _phone_detector is None:
+                from ultralytics import YOLO
+                _phone_detector = YOLO(PHONE_MODEL_PATH)
+    return _phone_detector
+
+def _phone_boxes(result):
+    boxes = []
+    for box in result.boxes:
+        cls_id = int(box.cls[0])
+        label = result.names[cls_id]
+        if label.lower() == "cell phone":
+            # print(f"📱 Detected phone at: ({x1}, {y1}, {x2}, {y2}) with label: {label}: {image_path}")
+            # exit()
+            x1, y1, x2, y2 = map(int, box.xyxy[0])
+            boxes.append((x1, y1, x2, y2))
+    return boxes
+
 def detect_phones(image_path):
-    model = YOLO("yolov8n.pt")  # Make sure this model file is downloaded
+    model = get_phone_detector()
     results = model(image_path)
     boxes = []
     for r in results:
-        for box in r.boxes:
-            cls_id = int(box.cls[0])
-            label = r.names[cls_id]
-            if label.lower() == "cell phone":
-                # print(f"📱 Detected phone at: ({x1}, {y1}, {x2}, {y2}) with label: {label}: {image_path}")
-                # exit()
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                boxes.append((x1, y1, x2, y2))
+        boxes.extend(_phone_boxes(r))
     return boxes
 
+def detect_phones_batch(image_paths, batch_size=16):
+    """Run batched CPU inference over many images (paths or encoded bytes), one box list per image in order."""
+    model = get_phone_detector()
+    all_boxes = []
+    for start in range(0, len(image_paths), batch_size):
+        chunk = [
+            open_image(p).convert("RGB") if isinstance(p, (bytes, bytearray)) else p
+            for p in image_paths[start:start + batch_size]
+        ]
+        results = model(chunk, device="cpu", verbose=False)
+        all_boxes.extend(_phone_boxes(r) for r in results)
+    return all_boxes
+
+def fit_box(box, src_size, dst_size):
+    """Map a box from source image coords into the ImageOps.fit (centered crop + resize) output."""
+    src_w, src_h = src_size
+    dst_w, dst_h = dst_size
+    scale = max(dst_w / src_w, dst_h / src_h)
+    crop_left = (src_w - dst_w / scale) / 2
+    crop_top = (src_h - dst_h / scale) / 2
+    x1, y1, x2, y2 = box
+    return (
+        int((x1 - crop_left) * scale),
+        int((y1 - crop_top) * scale),
+        int((x2 - crop_left) * scale),
+        int((y2 - crop_top) * scale),
+    )
+
+def place_text_away_from_phones(phone_boxes, safe_box, total_height):
+    """
+    Pick y for a text block spanning the safe box width that overlaps no phone.
+
+    Tries the centered position first, then the nearest free position. Returns
+    None if every position overlaps a phone.
+    """
+    safe_left, safe_top, safe_right, safe_bottom = safe_box
+    centered = max(safe_top, (safe_top + safe_bottom - total_height) // 2)
+    last_top = max(safe_top, safe_bottom - total_height)
+    candidates = sorted(range(safe_top, last_top + 1, 10), key=lambda y: abs(y - centered))
+    for y in [centered] + candidates:
+        text_box = (safe_left, y, safe_right, y + total_height)
+        if not any(box_overlap(text_box, phone) for phone in phone_boxes):
+            return y
+    return None
+
 def box_overlap(box1, box2):
     x1, y1, x2, y2 = box1
     a1, b1, a2, b2 = box2
@@ -72,28 +145,16 @@ def hex_to_rgb(hex_color):
         return (46, 204, 113, 255)
 
 def draw_soft_glow_text(base_img, position, text, font, fill="white", glow_color="#FF4EDB", glow_radius=10, blur_radius=8):
-    x, y = position
-
-    # Create a transparent layer to hold the glow
-    glow_layer = Image.new("RGBA", base_img.size, (0, 0, 0, 0))
-    glow_draw = ImageDraw.Draw(glow_layer)
-
-    # Draw thicker glow text onto glow layer
-    for dx in range(-glow_radius, glow_radius + 1):
-        for dy in range(-glow_radius, glow_radius + 1):
-            glow_draw.text((x + dx, y + dy), text, font=font, fill=glow_color)
-
-    # Apply Gaussian blur to glow layer
-    blurred_glow = glow_layer.filter(ImageFilter.GaussianBlur(blur_radius))
-
-    # Composite glow onto original
-    base_img = Image.alpha_composite(base_img, blurred_glow)
-
-    # Draw crisp white text on top
-    draw = ImageDraw.Draw(base_img)
-    draw.text((x, y), text, font=font, fill=fill)
-
-    return base_img
+    # Single-line wrapper around the mask based renderer in glow_text; draws into base_img in place and returns it
+    return draw_soft_glow_lines(
+        base_img,
+        [(position, text)],
+        font,
+        fill=fill,
+        glow_color=glow_color,
+        glow_radius=glow_radius,
+        blur_radius=blur_radius
+    )
 
 def download_font_from_drive(service, folder_id, temp_dir="temp"):
     """Download the first TTF file found in the given Drive folder."""
@@ -126,135 +187,215 @@ def get_font_size(char_count, base_chars=80, base_size=80, min_size=60):
     ratio = base_chars / char_count if char_count > base_chars else 1
     return max(int(base_size * ratio), min_size)
 
-def process_carousel(layout, image_paths, font_path, config, font_colors, slide_texts):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = f"temp/carousel_{timestamp}"
+def make_output_dir(output_dir=None):
+    if output_dir is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Suffix keeps carousels rendered within the same second apart
+        os.makedirs("temp", exist_ok=True)
+        return tempfile.mkdtemp(prefix=f"carousel_{timestamp}_", dir="temp")
     os.makedirs(output_dir, exist_ok=True)
+    return output_dir
+
+# plan_slide result for a slide whose font failed to load: the slide is skipped, not rendered without text
+SKIP_SLIDE = object()
+
+def plan_slide(i, layout, base_img, font_path, config, font_colors, slide_texts, phone_info=None):
+    """
+    Compile and place the RenderPlan for slide i on its fitted background.
+
+    Returns None if the slide has no text and SKIP_SLIDE if its font cannot be loaded.
+
+    The layout (font size, wrapping, line positions) is cached by text, font and
+    safe box; only the block's vertical placement depends on base_img and phone_info.
+    """
+    if i >= len(slide_texts) or not slide_texts[i]:
+        return None
+    width, height = base_img.size
+    text = slide_texts[i]
+    font_size = get_font_size(len(text))
+    try:
+        get_font(font_path, font_size)
+    except Exception as e:
+        print(f"❌ Failed to load font at size {font_size}: {e}")
+        return SKIP_SLIDE
+
+    print(f"📝 Drawing text on slide {i+1} (font size: {font_size}): {text}")
+    safe_box = get_tiktok_safe_area(width, height)
+    # img = draw_safe_area_outline(img, safe_box)
+    safe_left, safe_top, safe_right, safe_bottom = safe_box
+
+    # Binary search the font size; word widths are reused across sizes
+    with METRICS.timer("text_fit", slide=i + 1):
+        plan = compile_plan(text, font_path, font_size, safe_box)
+    if not plan.fitted:
+        print(f"⚠️ Slide {i+1}: text too tall to fit even at 60px. Rendering anyway at minimum font size.")
+
+    fill_color = hex_to_rgb(font_colors[i] if i < len(font_colors) else "#FFFFFF")
+    plan = plan.styled(fill=fill_color)
+    total_height = plan.total_height
+
+    # y_text = max(safe_top, (safe_top + safe_bottom - total_height) // 2)
+    if phone_info is not None:
+        # Detected phones (source coords) mapped onto the fitted slide
+        src_size, boxes = phone_info
+        fitted_boxes = [fit_box(box, src_size, (width, height)) for box in boxes]
+        if layout == "auto":
+            # Most legible phone-free position
+            with METRICS.timer("heatmap", slide=i + 1):
+                y_text = best_text_y(base_img, safe_box, plan.block_width, plan.block_height, fill_color, avoid_boxes=fitted_boxes)
+        else:
+            y_text = place_text_away_from_phones(fitted_boxes, safe_box, total_height)
+        if y_text is None:
+            print(f"⚠️ Slide {i+1}: no phone-free position for text, centering")
+            y_text = max(safe_top, (safe_top + safe_bottom - total_height) // 2)
+        elif fitted_boxes:
+            print(f"📱 Slide {i+1}: placed text at y={y_text} away from {len(fitted_boxes)} phone(s)")
+    # If this is every 4th image (iphone image), use fixed text position away from phone
+    elif (i + 1) % 4 == 0:
+        # Static position in top-left (adjust as needed)
+        x_text = 80
+        y_text = 100
+        print(f"📌 Slide {i+1} is iPhone layout — using static position (x={x_text}, y={y_text})")
+    elif layout == "auto":
+        # Darkest, calmest band of the background for the text colour
+        with METRICS.timer("heatmap", slide=i + 1):
+            y_text = best_text_y(base_img, safe_box, plan.block_width, plan.block_height, fill_color)
+        print(f"🌡️ Slide {i+1}: auto layout placed text at y={y_text}")
+    else:
+        y_text = max(safe_top, (safe_top + safe_bottom - total_height) // 2)
+
+    return plan.placed(y_text)
+
+def render_slide(i, layout, image_path, font_path, config, font_colors, slide_texts, output_dir, phone_info=None):
+    """
+    Render slide i of a carousel to output_dir/slide{i+1}.jpg and return its path (None if skipped).
+
+    image_path may also be the background's encoded bytes. With output_dir None
+    nothing is written and the slide's JPEG bytes are returned instead.
+    phone_info is the (source size, phone boxes) pair from PhoneBoxCache; without it
+    the old every-4th-slide static position is used.
+    """
+    if has_image(image_path):
+        width = config.get("output_width", 1080)
+        height = config.get("output_height", 1920)
+        # Draft-mode JPEG decode + fit, or the already fitted RGBA image from the background cache
+        base_img, report = load_background(image_path, (width, height), config)
+        print(f"🖼️ Slide {i+1} background: {report}")
+
+        img = base_img
+        plan = plan_slide(i, layout, base_img, font_path, config, font_colors, slide_texts, phone_info)
+        if plan is SKIP_SLIDE:
+            return None
+        if plan is not None:
+            # One cached text+glow sprite composited for the whole block
+            with METRICS.timer("glow", slide=i + 1):
+                img = rasterize(plan, base_img, config)
+
+                # 📌 Add font size reference
+                # debug_font = ImageFont.truetype(font_path, 30)
+                # debug_text = f"Font size: {font_size}px"
+                # img_draw = ImageDraw.Draw(img)
+                # img_draw.text((safe_left, safe_top - 40), debug_text, font=debug_font, fill=(255, 255, 255, 255))
+
+        return save_slide(i, img, output_dir)
+    return None
+
+def render_preview_slide(i, layout, image_path, font_path, config, font_colors, slide_texts, scale, phone_info=None):
+    """
+    Slide i as an RGB image at scale times the output size, or None without a background.
+
+    The plan is compiled and placed at full resolution, exactly as render_slide
+    does, then scaled, so line breaks, fitted sizes and placement match the real render.
+    """
+    if not has_image(image_path):
+        return None
+    width = config.get("output_width", 1080)
+    height = config.get("output_height", 1920)
+    base_img, report = load_background(image_path, (width, height), config)
+    print(f"🖼️ Slide {i+1} background: {report}")
+
+    plan = plan_slide(i, layout, base_img, font_path, config, font_colors, slide_texts, phone_info)
+    if plan is SKIP_SLIDE:
+        return None
+    img = base_img.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.Resampling.BILINEAR)
+    if plan is not None:
+        with METRICS.timer("glow", slide=i + 1):
+            img = rasterize(plan.scaled(scale), img, config)
+    return img.convert("RGB")
+
+def render_preview_carousel(layout, image_paths, font_path, config, font_colors, slide_texts, scale, phone_boxes=None):
+    """Preview images of every slide in slide order (None where a slide has no background)."""
+    if phone_boxes is None:
+        phone_boxes = [None] * len(image_paths)
+    return [
+        render_preview_slide(i, layout, image_path, font_path, config, font_colors, slide_texts, scale, phone_info)
+        for i, (image_path, phone_info) in enumerate(zip(image_paths, phone_boxes))
+    ]
+
+def save_slide(i, img, output_dir):
+    """Encode a rendered slide as JPEG: its bytes when output_dir is None, else the path written."""
+    img = img.convert("RGB")
+    if output_dir is None:
+        buffer = io.BytesIO()
+        with METRICS.timer("jpeg_encode", slide=i + 1):
+            img.save(buffer, "JPEG", quality=95)
+        print(f"✅ Processed slide {i+1} in memory (size={buffer.tell()} bytes)")
+        return buffer.getvalue()
+
+    output_path = os.path.join(output_dir, f"slide{i+1}.jpg")
+    print(f"🔍 About to save: {output_path}")
+    with METRICS.timer("jpeg_encode", slide=i + 1):
+        img.save(output_path, "JPEG", quality=95)
+    print(f"✅ Processed slide {i+1}: {output_path} (size={os.path.getsize(output_path)} bytes)")
+    return output_path
+
+def render_carousel(layout, image_paths, font_path, config, font_colors, slide_texts, output_dir=None, executor=None, phone_boxes=None, in_memory=False):
+    """
+    Render every slide and return (output_dir, slide paths in slide order).
+
+    With in_memory the slides are kept as JPEG bytes and output_dir is None.
+    """
+    if phone_boxes is None:
+        phone_boxes = [None] * len(image_paths)
+    output_dir = None if in_memory else make_output_dir(output_dir)
 
     # Load font
     font_size = config.get("font_size", 120)  # Increased size for visibility
     font = None
     if font_path and os.path.exists(font_path):
         try:
-            font = ImageFont.truetype(font_path, font_size)
+            font = get_font(font_path, font_size)
             print(f"✅ Font loaded successfully from {font_path}")
         except Exception as e:
             print(f"❌ Font loading error from {font_path}: {str(e)}")
     if not font:
         print("⚠️ No valid font available, saving images without text")
 
-    for i, image_path in enumerate(image_paths):
-        if image_path and os.path.exists(image_path):
-            base_img = Image.open(image_path)
-            width = config.get("output_width", 1080)
-            height = config.get("output_height", 1920)
-            base_img = ImageOps.fit(base_img, (width, height), Image.Resampling.LANCZOS, centering=(0.5, 0.5))
-            base_img = base_img.convert("RGBA")
-
-            img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-            img.paste(base_img, (0, 0))
-
-            if i < len(slide_texts) and slide_texts[i]:
-                text = slide_texts[i]
-                font_size = get_font_size(len(text))
-                try:
-                    font = ImageFont.truetype(font_path, font_size)
-                except Exception as e:
-                    print(f"❌ Failed to load font at size {font_size}: {e}")
-                    continue
-
-                print(f"📝 Drawing text on slide {i+1} (font size: {font_size}): {text}")
-                margin = 50
-                safe_box = get_tiktok_safe_area(width, height)
-                # img = draw_safe_area_outline(img, safe_box)
-
-                safe_left = safe_box[0]
-                safe_top = safe_box[1]
-                safe_right = safe_box[2]
-                safe_bottom = safe_box[3]
-                max_width = safe_right - safe_left
-                max_height = safe_bottom - safe_top
-
-                draw = ImageDraw.Draw(img)
-                line_spacing = 10
-
-                # Dynamically wrap text by pixel width, adjusting font size down if needed
-                min_font_size = 60
-                while True:
-                    font = ImageFont.truetype(font_path, font_size)
-                    lines = []
-                    current_line = ""
-                    for word in text.split():
-                        test_line = current_line + (" " if current_line else "") + word
-                        bbox = draw.textbbox((0, 0), test_line, font=font)
-                        if bbox[2] - bbox[0] <= max_width:
-                            current_line = test_line
-                        else:
-                            lines.append(current_line)
-                            current_line = word
-                    if current_line:
-                        lines.append(current_line)
-
-                    line_height = font.getbbox("Ay")[3] - font.getbbox("Ay")[1]
-                    total_height = len(lines) * (line_height + line_spacing)
-
-                    # 🔒 Enforce minimum font size of 60
-                    if total_height <= max_height:
-                        break
-                    if font_size <= min_font_size:
-                        print(f"⚠️ Slide {i+1}: text too tall to fit even at 60px. Rendering anyway at minimum font size.")
-                        font_size = min_font_size
-                        font = ImageFont.truetype(font_path, font_size)
-                        break
-
-                    font_size -= 2
-
-                # y_text = max(safe_top, (safe_top + safe_bottom - total_height) // 2)
-                # If this is every 4th image (iphone image), use fixed text position away from phone
-                if (i + 1) % 4 == 0:
-                    # Static position in top-left (adjust as needed)
-                    x_text = 80
-                    y_text = 100
-                    print(f"📌 Slide {i+1} is iPhone layout — using static position (x={x_text}, y={y_text})")
-                else:
-                    y_text = max(safe_top, (safe_top + safe_bottom - total_height) // 2)
-
-
-
-                fill_color = hex_to_rgb(font_colors[i] if i < len(font_colors) else "#FFFFFF")
-                for line in lines:
-                    draw = ImageDraw.Draw(img)
-                    bbox = draw.textbbox((0, 0), line, font=font)
-                    text_width = bbox[2] - bbox[0]
-                    # x_text = max(margin, (width - text_width) // 2)
-                    max_width = safe_right - safe_left
-                    x_text = safe_left + (max_width - text_width) // 2
-                    line = line.replace('"', '').replace("'", "") 
-                    img = draw_soft_glow_text(
-                        img,
-                        (x_text, y_text),
-                        line,
-                        font=font,
-                        fill=fill_color,
-                        glow_color="#FF4EDB"
-                    )
-                    line_spacing = 20 
-                    y_text += line_height + line_spacing
-
-                    # 📌 Add font size reference
-                    # debug_font = ImageFont.truetype(font_path, 30)
-                    # debug_text = f"Font size: {font_size}px"
-                    # img_draw = ImageDraw.Draw(img)
-                    # img_draw.text((safe_left, safe_top - 40), debug_text, font=debug_font, fill=(255, 255, 255, 255))
-
-
-            output_path = os.path.join(output_dir, f"slide{i+1}.jpg")
-            img = img.convert("RGB")
-            print(f"🔍 About to save: {output_path}")
-            img.save(output_path, "JPEG", quality=95)
-            print(f"✅ Processed slide {i+1}: {output_path} (size={os.path.getsize(output_path)} bytes)")
-
-    print(f"✅ Carousel ready at {output_dir}")
+    if executor is not None:
+        output_paths = executor.render_slides(layout, image_paths, font_path, config, font_colors, slide_texts, output_dir, phone_boxes)
+    else:
+        output_paths = [
+            render_slide(i, layout, image_path, font_path, config, font_colors, slide_texts, output_dir, phone_info)
+            for i, (image_path, phone_info) in enumerate(zip(image_paths, phone_boxes))
+        ]
+
+    print(f"✅ Carousel ready {'in memory' if in_memory else f'at {output_dir}'}")
+    return output_dir, output_paths
+
+def process_carousel(layout, image_paths, font_path, config, font_colors, slide_texts, output_dir=None, executor=None, phone_boxes=None, preview=False):
+    """
+    Render a carousel into output_dir and return it.
+
+    With preview, only output_dir/preview.jpg is written: a contact sheet of the
+    slides at the preview scale from config.yaml.
+    """
+    if preview:
+        scale, _, quality = preview_settings(config)
+        output_dir = make_output_dir(output_dir)
+        slides = render_preview_carousel(layout, image_paths, font_path, config, font_colors, slide_texts, scale, phone_boxes)
+        save_contact_sheet(os.path.join(output_dir, "preview.jpg"), [slides], quality=quality)
+        return output_dir
+    output_dir, _ = render_carousel(layout, image_paths, font_path, config, font_colors, slide_texts, output_dir, executor, phone_boxes)
     return output_dir
 
 if __name__ == "__main__":
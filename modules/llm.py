@@ -1,9 +1,24 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from dotenv import load_dotenv
+from modules.metrics import METRICS
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_client = None
+
+
+def get_openai_client():
+    """Shared OpenAI client, built on first use so importing needs no API key."""
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+def set_openai_client(client):
+    """Replace the shared client, e.g. with the fake in benchmarks/fakes.py."""
+    global _client
+    _client = client
 
 def generate_unique_variations(slide_text, num_outputs, existing_variations=None, model="gpt-4"):
     if existing_variations is None:
@@ -26,7 +41,7 @@ Original:
 "{slide_text}"
 """
 
-        response = client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model=model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.75,
@@ -41,6 +56,89 @@ Original:
     return variations
 
 
+def complete(client, model, prompt, temperature, max_tokens, cost, n=1, cache=None, first_sample=0):
+    """
+    Texts for samples first_sample .. first_sample + n - 1 of this prompt.
+
+    Samples found in cache are replayed for free; the rest come from one
+    chat completion request asking for that many candidates.
+    """
+    texts = [None] * n
+    if cache is not None:
+        keys = [cache.key(model, prompt, temperature, max_tokens, first_sample + i) for i in range(n)]
+        for i, key in enumerate(keys):
+            texts[i] = cache.get(key)
+        hits = sum(text is not None for text in texts)
+        if hits:
+            cost.add_cached(hits)
+
+    missing = [i for i, text in enumerate(texts) if text is None]
+    if missing:
+        with METRICS.timer("llm_call", n=len(missing)):
+            response = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                n=len(missing),
+            )
+        cost.add(response, model)  # <-- track cost
+        for i, choice in zip(missing, response.choices):
+            texts[i] = choice.message.content.strip()
+            if cache is not None:
+                cache.put(keys[i], texts[i])
+    return [text for text in texts if text is not None]
+
+def unique_variations(client, model, prompt, temperature, max_tokens, num_variations, cost, cache=None):
+    """Keep asking for the missing number of candidates (via n) until there are num_variations unique ones."""
+    generated = []
+    drawn = 0
+    while len(generated) < num_variations:
+        needed = num_variations - len(generated)
+        for text in complete(client, model, prompt, temperature, max_tokens, cost, n=needed, cache=cache, first_sample=drawn):
+            variation = text.replace('"', '')
+            if variation not in generated:
+                generated.append(variation)
+        drawn += needed
+    return generated[:num_variations]
+
+def variation_prompt(idx, original, non_hook_prompt_template, hook_prompt_template):
+    # Slide 1 is the hook and gets its own template
+    template = hook_prompt_template if idx == 0 else non_hook_prompt_template
+    return template.replace("{original}", original)
+
+def caption_prompt(strings, prompt_template):
+    slides_text = "\n".join(f"Slide {i+1}: {text}" for i, text in enumerate(strings))
+    return prompt_template.replace("{slides_text}", slides_text)
+
+def generate_row_texts(client, model, temperature, non_hook_prompt_template, hook_prompt_template, caption_template,
+                       strings, num_variations, cost, max_tokens=50, caption_max_tokens=50, max_concurrency=8, cache=None):
+    """
+    Generate every slide's variations and the caption concurrently.
+
+    Returns ([strings] + variation_buckets, caption), the same shape the
+    serial generate_variations/generate_caption produce.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        caption_future = pool.submit(
+            complete, client, model, caption_prompt(strings, caption_template), temperature, caption_max_tokens, cost,
+            cache=cache
+        )
+        slide_futures = [
+            pool.submit(
+                unique_variations, client, model,
+                variation_prompt(idx, original, non_hook_prompt_template, hook_prompt_template),
+                temperature, max_tokens, num_variations, cost, cache
+            )
+            for idx, original in enumerate(strings)
+        ]
+        per_slide = [future.result() for future in slide_futures]
+        caption = caption_future.result()[0]
+
+    variation_buckets = [[variations[i] for variations in per_slide] for i in range(num_variations)]
+    return [strings] + variation_buckets, caption
+
+
 # def chat_with_gpt_variations(slide_text: str, n: int, model="gpt-4", temperature=0.7, max_tokens=200):
 #     prompt_template = f"""Rewrite the following text in a tone that resonates with Gen Z women on TikTok.
 # It should be casual, punchy, and authentic — the kind of hook that would appear as text on a TikTok carousel.
@@ -0,0 +1,189 @@
+import json
+import os
+import time
+from datetime import datetime
+from modules.llm import complete, variation_prompt, caption_prompt
+
+BATCH_DIR = "temp/batch"
+BATCH_ENDPOINT = "/v1/chat/completions"
+POLL_SECONDS = 30
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def slide_custom_id(row_index, slide_index):
+    return f"row{row_index}-slide{slide_index}"
+
+def caption_custom_id(row_index):
+    return f"row{row_index}-caption"
+
+def _request_line(custom_id, model, prompt, temperature, max_tokens, n=1):
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "n": n,
+        },
+    }
+
+def _is_cached(cache, model, prompt, temperature, max_tokens, n):
+    if cache is None:
+        return False
+    return all(cache.get(cache.key(model, prompt, temperature, max_tokens, i)) is not None for i in range(n))
+
+def write_batch_file(rows, model, temperature, non_hook_prompt_template, hook_prompt_template, caption_template,
+                     num_variations, max_tokens=100, caption_max_tokens=150, batch_dir=BATCH_DIR, cache=None):
+    """
+    Write hook, non-hook and caption requests for every row to a Batch API JSONL file.
+
+    rows is a list of (row_index, slide_texts). Requests whose samples are all in
+    cache are left out. Returns (file path, number of requests written).
+    """
+    os.makedirs(batch_dir, exist_ok=True)
+    path = os.path.join(batch_dir, f"requests_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+    count = 0
+    with open(path, "w") as f:
+        for row_index, strings in rows:
+            for idx, original in enumerate(strings):
+                prompt = variation_prompt(idx, original, non_hook_prompt_template, hook_prompt_template)
+                if _is_cached(cache, model, prompt, temperature, max_tokens, num_variations):
+                    continue
+                line = _request_line(slide_custom_id(row_index, idx), model, prompt, temperature, max_tokens, n=num_variations)
+                f.write(json.dumps(line) + "\n")
+                count += 1
+            prompt = caption_prompt(strings, caption_template)
+            if _is_cached(cache, model, prompt, temperature, caption_max_tokens, 1):
+                continue
+            f.write(json.dumps(_request_line(caption_custom_id(row_index), model, prompt, temperature, caption_max_tokens)) + "\n")
+            count += 1
+    return path, count
+
+def submit_batch(client, path):
+    with open(path, "rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+    )
+    print(f"📦 Submitted batch {batch.id} ({path})")
+    return batch.id
+
+def wait_for_batch(client, batch_id, poll_seconds=POLL_SECONDS):
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in TERMINAL_STATUSES:
+            print(f"📦 Batch {batch_id} {batch.status}")
+            return batch
+        print(f"⏳ Batch {batch_id} {batch.status}, checking again in {poll_seconds}s")
+        time.sleep(poll_seconds)
+
+def _records(client, file_id):
+    if not file_id:
+        return []
+    return [json.loads(line) for line in client.files.content(file_id).text.splitlines() if line.strip()]
+
+def read_batch_results(client, batch):
+    """Map custom_id -> response body for every request that succeeded; failed requests are logged."""
+    results = {}
+    failed = 0
+    # Requests that errored out entirely are only listed in the error file
+    for record in _records(client, batch.output_file_id) + _records(client, getattr(batch, "error_file_id", None)):
+        response = record.get("response") or {}
+        if response.get("status_code") == 200:
+            results[record["custom_id"]] = response["body"]
+        else:
+            failed += 1
+            print(f"⚠️ Batch request {record.get('custom_id')} failed: {record.get('error') or response}")
+    if failed:
+        print(f"⚠️ Batch {batch.id}: {failed} request(s) failed")
+    return results
+
+def _check_batch(batch, count, results, fallback):
+    """Refuse to regenerate a whole failed batch interactively unless fallback is allowed."""
+    if batch.status == "completed" and results:
+        return
+    reason = f"ended {batch.status}" if batch.status != "completed" else "returned no results"
+    errors = getattr(batch, "errors", None)
+    if errors:
+        reason += f" ({errors})"
+    if not fallback:
+        raise RuntimeError(
+            f"batch {batch.id} {reason}; set llm_batch_fallback: true to generate its {count} request(s) interactively"
+        )
+    print(f"⚠️ Batch {batch.id} {reason}, generating its {count} request(s) interactively (llm_batch_fallback)")
+
+def _texts(body):
+    return [choice["message"]["content"].strip() for choice in body.get("choices", [])]
+
+def _store(cache, model, prompt, temperature, max_tokens, texts):
+    if cache is not None:
+        for i, text in enumerate(texts):
+            cache.put(cache.key(model, prompt, temperature, max_tokens, i), text)
+
+def _unique(texts, variations):
+    for text in texts:
+        variation = text.replace('"', '')
+        if variation not in variations:
+            variations.append(variation)
+    return variations
+
+def generate_rows_batch(client, model, temperature, non_hook_prompt_template, hook_prompt_template, caption_template,
+                        rows, num_variations, cost, max_tokens=100, caption_max_tokens=150, poll_seconds=POLL_SECONDS,
+                        cache=None, fallback=False):
+    """
+    Batch API version of llm.generate_row_texts for many rows at once.
+
+    Returns {row_index: (carousels, caption)}. Answers already in cache are not
+    sent; requests that failed in the batch, or came back with too few unique
+    variations, are topped up interactively. A batch that did not complete (or
+    returned nothing) raises RuntimeError unless fallback allows regenerating
+    everything interactively.
+    """
+    path, count = write_batch_file(rows, model, temperature, non_hook_prompt_template, hook_prompt_template,
+                                   caption_template, num_variations, max_tokens, caption_max_tokens, cache=cache)
+    bodies = {}
+    if count:
+        batch = wait_for_batch(client, submit_batch(client, path), poll_seconds)
+        bodies = read_batch_results(client, batch)
+        _check_batch(batch, count, bodies, fallback)
+        for body in bodies.values():
+            cost.add(body, model, batch=True)
+    else:
+        print("📦 Every request is cached, no batch submitted")
+
+    generated = {}
+    for row_index, strings in rows:
+        per_slide = []
+        for idx, original in enumerate(strings):
+            prompt = variation_prompt(idx, original, non_hook_prompt_template, hook_prompt_template)
+            body = bodies.get(slide_custom_id(row_index, idx))
+            if body is not None:
+                texts = _texts(body)
+                _store(cache, model, prompt, temperature, max_tokens, texts)
+            else:
+                # Cached (or failed) request: replay from cache, fetch whatever is missing
+                texts = complete(client, model, prompt, temperature, max_tokens, cost, n=num_variations, cache=cache)
+            variations = _unique(texts, [])
+            drawn = num_variations
+            while len(variations) < num_variations:
+                needed = num_variations - len(variations)
+                _unique(complete(client, model, prompt, temperature, max_tokens, cost, n=needed, cache=cache, first_sample=drawn), variations)
+                drawn += needed
+            per_slide.append(variations[:num_variations])
+
+        prompt = caption_prompt(strings, caption_template)
+        body = bodies.get(caption_custom_id(row_index))
+        if body is not None and _texts(body):
+            captions = _texts(body)
+            _store(cache, model, prompt, temperature, caption_max_tokens, captions[:1])
+        else:
+            captions = complete(client, model, prompt, temperature, caption_max_tokens, cost, cache=cache)
+
+        variation_buckets = [[variations[i] for variations in per_slide] for i in range(num_variations)]
+        generated[row_index] = ([strings] + variation_buckets, captions[0])
+    return generated
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from modules.utils import atomic_write_text
+
+LLM_CACHE_DIR = "cache/llm"
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+# Size-based eviction scans the directory, so only do it every this many writes
+EVICT_EVERY = 200
+
+
+class LLMResponseCache:
+    """
+    On-disk cache of completion texts keyed by (model, prompt, temperature, max_tokens, sample index).
+
+    The sample index tells apart the candidates asked for with the same prompt, so
+    a re-run replays exactly the texts (and therefore the variations) of the
+    first run. With bypass set nothing is read but fresh answers still replace
+    the stored ones.
+    """
+
+    def __init__(self, cache_dir=LLM_CACHE_DIR, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES, bypass=False):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.evict()
+
+    @classmethod
+    def from_config(cls, config):
+        options = config.get("llm_cache") or {}
+        bypass = bool(options.get("bypass", False)) or os.getenv("LLM_CACHE_BYPASS", "") not in ("", "0")
+        return cls(
+            ttl_seconds=options.get("ttl_hours", DEFAULT_TTL_SECONDS / 3600) * 3600,
+            max_bytes=options.get("max_mb", DEFAULT_MAX_BYTES / 1024 ** 2) * 1024 ** 2,
+            bypass=bypass,
+        )
+
+    @staticmethod
+    def key(model, prompt, temperature, max_tokens, sample_index):
+        raw = json.dumps([model, prompt, temperature, max_tokens, sample_index])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        if self.bypass:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl_seconds:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        return entry["text"]
+
+    def put(self, key, text):
+        atomic_write_text(self._path(key), json.dumps({"text": text, "created": time.time()}))
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones until the cache fits max_bytes."""
+        now = time.time()
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.ttl_seconds:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,228 @@
+import cProfile
+import io
+import json
+import math
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Set to a stage name (e.g. "glow") to profile just that stage; overrides the metrics.profile_stage config
+PROFILE_ENV = "CAROUSEL_PROFILE_STAGE"
+PROFILE_DIR = "cache/profiles"
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[rank - 1]
+
+
+class Metrics:
+    """
+    Per-stage timers and event counters for one process.
+
+    Every timed call is kept as a sample with its labels (row, variation,
+    slide...), so the report can give p50/p95/max per stage and the JSON export
+    can break them down per row or per slide. Render worker processes send
+    their samples back with each result and the parent merges them.
+
+    One stage can be profiled with cProfile or tracemalloc without editing
+    code: set metrics.profile_stage in config.yaml or CAROUSEL_PROFILE_STAGE.
+    Only calls made in the main process are profiled. With tracemalloc the
+    profiled stage's calls are serialized, so its peaks are not mixed up
+    between threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+        self.counters = defaultdict(int)
+        self.started = time.time()
+        self.profile_stage = None
+        self.profile_mode = "cprofile"
+        # cProfile can only profile the calling thread, so one profiler per thread id
+        self._profiler = {}
+        self._profile_calls = 0
+        self._alloc_peaks = []
+        # tracemalloc's peak is process-wide: profiled calls take turns so each peak is their own
+        self._alloc_lock = threading.RLock()
+        self._alloc_base = 0
+
+    def configure_profile(self, stage=None, mode="cprofile"):
+        self.profile_stage = os.environ.get(PROFILE_ENV) or stage
+        self.profile_mode = mode
+        if self.profile_stage:
+            print(f"🔬 Profiling stage '{self.profile_stage}' with {mode}")
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        profiling = stage == self.profile_stage
+        if profiling:
+            self._start_profile()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiling:
+                self._stop_profile()
+            self.observe(stage, elapsed, **labels)
+
+    def observe(self, stage, seconds, **labels):
+        with self._lock:
+            self.samples.append((stage, seconds, labels))
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def drain(self):
+        """Hand over and forget this process' samples and counters (used by render workers)."""
+        with self._lock:
+            samples, self.samples = self.samples, []
+            counters, self.counters = dict(self.counters), defaultdict(int)
+        return samples, counters
+
+    def merge(self, drained):
+        samples, counters = drained
+        with self._lock:
+            self.samples.extend(samples)
+            for name, value in counters.items():
+                self.counters[name] += value
+
+    def _start_profile(self):
+        if self.profile_mode == "tracemalloc":
+            # Held until _stop_profile, so the profiled stage runs one call at a time while profiling
+            self._alloc_lock.acquire()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+            tracemalloc.reset_peak()
+            self._alloc_base = tracemalloc.get_traced_memory()[0]
+        else:
+            with self._lock:
+                profiler = self._profiler.setdefault(threading.get_ident(), cProfile.Profile())
+            profiler.enable()
+
+    def _stop_profile(self):
+        with self._lock:
+            self._profile_calls += 1
+        if self.profile_mode == "tracemalloc":
+            try:
+                current, peak = tracemalloc.get_traced_memory()
+                with self._lock:
+                    self._alloc_peaks.append(peak - self._alloc_base)
+            finally:
+                self._alloc_lock.release()
+        else:
+            with self._lock:
+                profiler = self._profiler[threading.get_ident()]
+            profiler.disable()
+
+    def _by_stage(self):
+        with self._lock:
+            samples = list(self.samples)
+        by_stage = defaultdict(list)
+        for stage, seconds, _ in samples:
+            by_stage[stage].append(seconds)
+        return {stage: sorted(values) for stage, values in sorted(by_stage.items())}
+
+    def stage_stats(self):
+        stats = {}
+        for stage, values in self._by_stage().items():
+            stats[stage] = {
+                "count": len(values),
+                "total": sum(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": values[-1],
+            }
+        return stats
+
+    def throughput(self):
+        minutes = (time.time() - self.started) / 60
+        return self.counters.get("carousels", 0) / minutes if minutes > 0 else 0.0
+
+    def report(self) -> str:
+        lines = [f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'total s':>10}"]
+        for stage, s in self.stage_stats().items():
+            lines.append(
+                f"{stage:<22}{s['count']:>7}{s['p50'] * 1000:>10.1f}{s['p95'] * 1000:>10.1f}"
+                f"{s['max'] * 1000:>10.1f}{s['total']:>10.2f}"
+            )
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name}: {value}")
+        lines.append(f"Throughput: {self.throughput():.2f} carousels/min over {time.time() - self.started:.0f}s")
+        return "\n".join(lines)
+
+    def to_json(self):
+        with self._lock:
+            samples = [{"stage": stage, "seconds": seconds, **labels} for stage, seconds, labels in self.samples]
+            counters = dict(self.counters)
+        return json.dumps({
+            "started": self.started,
+            "elapsed": time.time() - self.started,
+            "carousels_per_minute": self.throughput(),
+            "stages": self.stage_stats(),
+            "counters": counters,
+            "samples": samples,
+        }, indent=2)
+
+    def to_prometheus(self):
+        lines = [
+            "# HELP carousel_stage_seconds Time spent per call in each stage.",
+            "# TYPE carousel_stage_seconds summary",
+        ]
+        for stage, s in self.stage_stats().items():
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("1", "max")):
+                lines.append(f'carousel_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {s[key]:.6f}')
+            lines.append(f'carousel_stage_seconds_sum{{stage="{stage}"}} {s["total"]:.6f}')
+            lines.append(f'carousel_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+        lines += ["# HELP carousel_events_total Events counted during the run.", "# TYPE carousel_events_total counter"]
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'carousel_events_total{{name="{name}"}} {value}')
+        lines += [
+            "# HELP carousel_throughput_per_minute Carousels finished per minute.",
+            "# TYPE carousel_throughput_per_minute gauge",
+            f"carousel_throughput_per_minute {self.throughput():.4f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Write the metrics as Prometheus text (.prom/.txt) or JSON (anything else)."""
+        from modules.utils import atomic_write_text
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        atomic_write_text(path, text)
+        print(f"📈 Metrics written to {path}")
+
+    def profile_report(self, top=15) -> str:
+        if not self.profile_stage or not self._profile_calls:
+            return ""
+        if self.profile_mode == "tracemalloc":
+            snapshot = tracemalloc.take_snapshot()
+            peaks = sorted(self._alloc_peaks)
+            lines = [
+                f"tracemalloc for '{self.profile_stage}' over {self._profile_calls} call(s): "
+                f"peak p50 {percentile(peaks, 50) / 1024 ** 2:.1f} MB, max {peaks[-1] / 1024 ** 2:.1f} MB",
+            ]
+            lines += [str(stat) for stat in snapshot.statistics("lineno")[:top]]
+            return "\n".join(lines)
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{self.profile_stage}.prof")
+        profilers = list(self._profiler.values())
+        stats = pstats.Stats(profilers[0], stream=io.StringIO())
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        stats.dump_stats(path)
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(top)
+        return f"cProfile for '{self.profile_stage}' over {self._profile_calls} call(s), saved to {path}\n{out.getvalue()}"
+
+METRICS = Metrics()
@@ -0,0 +1,114 @@
+import atexit
+import fcntl
+import json
+import os
+import threading
+from modules.google_clients import get_worksheet
+from modules.metrics import METRICS
+
+OUTPUT_ID_STATE_PATH = "cache/output_ids.json"
+
+
+class CarouselOutputWriter:
+    """
+    Buffered writer for the 'Carousel Outputs' tab with local ID allocation.
+
+    Column A is read once, on the first allocation. After that IDs come from
+    a local counter kept in a lock-protected state file, so concurrent runs
+    on this machine never hand out the same ID. Runs on different machines
+    don't share that file: the GitHub workflow's concurrency group keeps them
+    from overlapping. Rows are buffered and written with append_rows every
+    batch_size rows, and on exit.
+    """
+
+    def __init__(self, spreadsheet_id, worksheet_title='Carousel Outputs', batch_size=10, state_path=OUTPUT_ID_STATE_PATH):
+        self.spreadsheet_id = spreadsheet_id
+        self.worksheet_title = worksheet_title
+        self.batch_size = max(1, batch_size)
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._sheet_last_id = None
+        self._pending = []
+        self.rows_written = 0
+        self.flushes = 0
+        atexit.register(self.flush)
+
+    def _worksheet(self):
+        return get_worksheet(self.spreadsheet_id, self.worksheet_title)
+
+    def _read_sheet_last_id(self):
+        # Get all values in column A, filter out empty cells
+        col_a_values = [v for v in self._worksheet().col_values(1) if v.strip() != ""]
+        if not col_a_values:
+            return 0
+        try:
+            return int(col_a_values[-1].strip().lstrip("#"))
+        except ValueError:
+            return 0
+
+    def allocate_id(self):
+        """Next '#N' id, unique across concurrent runs sharing this machine's cache dir (not across machines)."""
+        with self._lock:
+            if self._sheet_last_id is None:
+                self._sheet_last_id = self._read_sheet_last_id()
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            with open(self.state_path, "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    state = json.loads(raw) if raw.strip() else {}
+                    last_id = state.get(self.spreadsheet_id, 0)
+                    next_id = max(last_id, self._sheet_last_id) + 1
+                    state[self.spreadsheet_id] = next_id
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        print(next_id)
+        return f"#{next_id}"
+
+    @staticmethod
+    def build_row(slide_texts, id, caption, temperature, cost):
+        # Build the row: id in col A, slides in cols B-G, caption in col H
+        row = [id] + list(slide_texts)
+
+        # Ensure caption is in column H (index 7 in 0-based Python list)
+        while len(row) < 7:  # Fill blanks until before column H
+            row.append("")
+        row.append(caption)
+        row.append(temperature)
+        row.append(cost)
+        return row
+
+    def add(self, slide_texts, id, caption, temperature, cost, on_written=None):
+        """Buffer a row; on_written() is called once it has actually been appended to the sheet."""
+        with self._lock:
+            self._pending.append((self.build_row(slide_texts, id, caption, temperature, cost), on_written))
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        rows = [row for row, _ in pending]
+        try:
+            with METRICS.timer("sheet_write", rows=len(rows)):
+                self._worksheet().append_rows(rows, value_input_option='RAW')
+        except Exception:
+            # Put them back so a later flush (or the exit hook) can retry
+            with self._lock:
+                self._pending = pending + self._pending
+            raise
+        with self._lock:
+            self.rows_written += len(rows)
+            self.flushes += 1
+        print(f"🧾 Wrote {len(rows)} row(s) to '{self.worksheet_title}'")
+        for _, on_written in pending:
+            if on_written is not None:
+                on_written()
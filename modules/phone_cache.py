@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import threading
+from modules.utils import file_sha256, atomic_write_text
+
+PHONE_CACHE_PATH = "cache/phone_boxes.json"
+
+
+def content_key(image_path):
+    if isinstance(image_path, (bytes, bytearray)):
+        return f"sha256:{hashlib.sha256(image_path).hexdigest()}"
+    return f"sha256:{file_sha256(image_path)}"
+
+def drive_key(file_id, modified_time):
+    return f"drive:{file_id}:{modified_time}"
+
+
+class PhoneBoxCache:
+    """
+    On-disk cache of detected "cell phone" boxes per background image.
+
+    Entries are keyed by content hash or Drive file ID + modifiedTime and hold
+    the source image size next to the boxes, so they can be mapped onto the
+    fitted slide without reopening the image.
+    """
+
+    def __init__(self, path=PHONE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable phone box cache {path}: {e}")
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return tuple(entry["size"]), [tuple(b) for b in entry["boxes"]]
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def put(self, key, size, boxes):
+        with self._lock:
+            self._entries[key] = {"size": list(size), "boxes": [list(b) for b in boxes]}
+
+    def save(self):
+        with self._lock:
+            atomic_write_text(self.path, json.dumps(self._entries))
+
+    def detect(self, image_paths, keys=None, batch_size=16):
+        """
+        Return (size, boxes) per image, running one batched inference for the uncached ones.
+
+        Images may be paths or encoded bytes. keys defaults to content hashes;
+        pass drive_key(...) values to skip hashing. Missing images give None.
+        """
+        from modules.image_handler import detect_phones_batch, has_image, open_image
+
+        if keys is None:
+            keys = [content_key(p) if has_image(p) else None for p in image_paths]
+
+        misses = []
+        for path, key in zip(image_paths, keys):
+            if key is not None and key not in self._entries and path not in misses:
+                misses.append(path)
+
+        if misses:
+            print(f"📱 Detecting phones in {len(misses)} uncached image(s)")
+            detected = dict(zip(misses, detect_phones_batch(misses, batch_size=batch_size)))
+            for path, key in zip(image_paths, keys):
+                if path in detected and key not in self._entries:
+                    with open_image(path) as img:
+                        size = img.size
+                    self.put(key, size, detected[path])
+            self.save()
+
+        return [self.get(key) if key is not None else None for key in keys]
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from modules.metrics import METRICS
+
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a Pipeline.
+
+    fn runs on a thread pool of `concurrency` threads, one item at a time per
+    thread. With fan_out, fn returns a list of items and each is passed on
+    separately. The last stage's return values are discarded.
+    """
+
+    def __init__(self, name, fn, concurrency=1, fan_out=False):
+        self.name = name
+        self.fn = fn
+        self.concurrency = max(1, int(concurrency or 1))
+        self.fan_out = fan_out
+
+
+class CarouselItem:
+    """State of one row (before fan-out) or one carousel variation as it moves through the stages."""
+
+    def __init__(self, row_index, row, variation=None, slide_texts=None, caption=None, font_path=None, row_hash=None):
+        self.row_index = row_index
+        self.row = row
+        self.row_hash = row_hash
+        self.variation = variation
+        self.slide_texts = slide_texts
+        self.caption = caption
+        self.font_path = font_path
+        self.image_paths = []
+        self.phone_keys = []
+        self.phone_boxes = None
+        self.output_dir = None
+        self.slides = []
+        self.carousel_id = None
+        self.folder_id = None
+        self.file_ids = []
+        # Slide name -> Drive file ID for slides already in folder_id (journaled per slide)
+        self.uploaded_slides = {}
+        # Last stage completed by an earlier, interrupted run (see modules/run_journal.py)
+        self.stage = None
+
+    @property
+    def label(self):
+        if self.variation is None:
+            return f"row {self.row_index}"
+        return f"row {self.row_index} variation {self.variation}"
+
+
+def _label(item):
+    return getattr(item, "label", repr(item))
+
+
+class Pipeline:
+    """
+    Runs items through stages connected by bounded asyncio queues.
+
+    A full queue blocks the stage feeding it, so at most queue_size items
+    wait between two stages and memory stays bounded however many rows
+    there are. An exception fails only the item it was raised for; it is
+    logged and counted and the rest of the run continues.
+    """
+
+    def __init__(self, stages, queue_size=4, on_error=None):
+        self.stages = stages
+        self.queue_size = max(1, int(queue_size or 1))
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        self.completed = {stage.name: 0 for stage in stages}
+        self.failed = {stage.name: 0 for stage in stages}
+        self.failures = []
+        self.elapsed = 0.0
+
+    async def _worker(self, stage, executor, inbox, outbox):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            try:
+                result = await loop.run_in_executor(executor, self._timed, stage, item)
+            except Exception as e:
+                with self._lock:
+                    self.failed[stage.name] += 1
+                    self.failures.append((stage.name, _label(item), str(e)))
+                print(f"❌ Stage '{stage.name}' failed for {_label(item)}: {e}")
+                if self.on_error is not None:
+                    self.on_error(stage.name, item, e)
+                continue
+            with self._lock:
+                self.completed[stage.name] += 1
+            if outbox is None:
+                continue
+            for out in (result if stage.fan_out else [result]):
+                await outbox.put(out)
+
+    @staticmethod
+    def _timed(stage, item):
+        labels = {"row": getattr(item, "row_index", None)}
+        if getattr(item, "variation", None) is not None:
+            labels["variation"] = item.variation
+        with METRICS.timer(f"pipeline.{stage.name}", **labels):
+            return stage.fn(item)
+
+    async def _run_stage(self, stage, executor, inbox, outbox, next_concurrency):
+        await asyncio.gather(*(
+            self._worker(stage, executor, inbox, outbox) for _ in range(stage.concurrency)
+        ))
+        if outbox is not None:
+            for _ in range(next_concurrency):
+                await outbox.put(_DONE)
+
+    async def _feed(self, items, queue, concurrency):
+        for item in items:
+            await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(_DONE)
+
+    async def run(self, items):
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        executors = [
+            ThreadPoolExecutor(max_workers=stage.concurrency, thread_name_prefix=stage.name)
+            for stage in self.stages
+        ]
+        start = time.perf_counter()
+        try:
+            tasks = [self._feed(items, queues[0], self.stages[0].concurrency)]
+            for n, stage in enumerate(self.stages):
+                last = n == len(self.stages) - 1
+                tasks.append(self._run_stage(
+                    stage, executors[n], queues[n],
+                    None if last else queues[n + 1],
+                    0 if last else self.stages[n + 1].concurrency,
+                ))
+            await asyncio.gather(*tasks)
+        finally:
+            self.elapsed = time.perf_counter() - start
+            # On cancellation (Ctrl+C) don't wait for queued work, only for calls already running
+            for executor in executors:
+                executor.shutdown(wait=True, cancel_futures=True)
+        return self
+
+    def run_sync(self, items):
+        return asyncio.run(self.run(items))
+
+    def summary(self) -> str:
+        lines = [f"Pipeline finished in {self.elapsed:.1f}s"]
+        for stage in self.stages:
+            lines.append(
+                f"  {stage.name}: {self.completed[stage.name]} ok, {self.failed[stage.name]} failed "
+                f"(concurrency {stage.concurrency})"
+            )
+        for name, label, error in self.failures:
+            lines.append(f"  ❌ {name} / {label}: {error}")
+        return "\n".join(lines)
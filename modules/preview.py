@@ -0,0 +1,96 @@
+import os
+from PIL import Image, ImageDraw, ImageFont
+
+# Slides are rendered at this fraction of output_width x output_height unless preview.scale says otherwise
+PREVIEW_SCALE = 0.25
+PREVIEW_DIR = "previews"
+PREVIEW_QUALITY = 85
+
+GAP = 8
+LABEL_HEIGHT = 20
+SHEET_BACKGROUND = (24, 24, 24)
+MISSING_SLIDE = (64, 64, 64)
+
+
+def preview_settings(config):
+    """(scale, output dir, JPEG quality) from the preview section of config.yaml."""
+    settings = (config or {}).get("preview", {}) or {}
+    return (
+        float(settings.get("scale", PREVIEW_SCALE)),
+        settings.get("output_dir", PREVIEW_DIR),
+        int(settings.get("jpeg_quality", PREVIEW_QUALITY)),
+    )
+
+def contact_sheet(rows, labels=None):
+    """
+    One image with a row of slides per carousel.
+
+    rows is a list of slide image lists (None for a missing slide); each row gets
+    its label above it. Cells are sized to the largest slide.
+    """
+    slides = [slide for row in rows for slide in row if slide is not None]
+    if not slides:
+        return None
+    cell_w = max(slide.width for slide in slides)
+    cell_h = max(slide.height for slide in slides)
+    columns = max(len(row) for row in rows)
+    width = GAP + columns * (cell_w + GAP)
+    height = GAP + len(rows) * (LABEL_HEIGHT + cell_h + GAP)
+
+    sheet = Image.new("RGB", (width, height), SHEET_BACKGROUND)
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default()
+    for r, row in enumerate(rows):
+        top = GAP + r * (LABEL_HEIGHT + cell_h + GAP)
+        if labels:
+            draw.text((GAP, top + 4), labels[r], font=font, fill=(220, 220, 220))
+        for c, slide in enumerate(row):
+            left = GAP + c * (cell_w + GAP)
+            if slide is None:
+                draw.rectangle((left, top + LABEL_HEIGHT, left + cell_w - 1, top + LABEL_HEIGHT + cell_h - 1), fill=MISSING_SLIDE)
+            else:
+                sheet.paste(slide.convert("RGB"), (left, top + LABEL_HEIGHT))
+    return sheet
+
+def save_contact_sheet(path, rows, labels=None, quality=PREVIEW_QUALITY):
+    sheet = contact_sheet(rows, labels)
+    if sheet is None:
+        print(f"⚠️ Nothing to preview for {path}")
+        return None
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    sheet.save(path, "JPEG", quality=quality)
+    print(f"🔎 Preview written to {path} ({sheet.width}x{sheet.height})")
+    return path
+
+
+class PreviewCollector:
+    """
+    Gathers the preview slides of each row's variations and writes one contact sheet per row.
+
+    A row's sheet is written as soon as `expected` variations have arrived; flush()
+    writes whatever is left (rows where a variation failed).
+    """
+
+    def __init__(self, output_dir=PREVIEW_DIR, expected=1, quality=PREVIEW_QUALITY):
+        self.output_dir = output_dir
+        self.expected = expected
+        self.quality = quality
+        self._rows = {}
+        self.written = []
+
+    def add(self, row_index, variation, slides):
+        variations = self._rows.setdefault(row_index, {})
+        variations[variation] = slides
+        if len(variations) >= self.expected:
+            self._write(row_index)
+
+    def flush(self):
+        for row_index in sorted(self._rows):
+            self._write(row_index)
+
+    def _write(self, row_index):
+        variations = self._rows.pop(row_index)
+        order = sorted(variations)
+        path = os.path.join(self.output_dir, f"row{row_index}.jpg")
+        if save_contact_sheet(path, [variations[v] for v in order], [f"Row {row_index} variation {v}" for v in order], self.quality):
+            self.written.append(path)
@@ -0,0 +1,160 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from modules.font_cache import get_font, preload_font
+from modules.image_handler import render_slide, render_carousel, make_output_dir
+from modules.metrics import METRICS
+from modules.render_plan import sprite_cache_usage
+
+# Sizes get_font_size/fit_text can ask for; workers parse them once at startup
+WARM_FONT_SIZES = range(60, 81)
+
+
+def _warm_worker(font_paths):
+    # Forked workers start with a copy of the parent's samples; they must not be sent back
+    METRICS.drain()
+    for font_path in font_paths:
+        if font_path and os.path.exists(font_path):
+            preload_font(font_path)
+            for size in WARM_FONT_SIZES:
+                get_font(font_path, size)
+
+def _worker_state(config):
+    # Timings and this worker's sprite cache occupancy travel back with each result
+    return METRICS.drain(), (os.getpid(), sprite_cache_usage(config))
+
+def _noop():
+    return None
+
+def _render_slide_task(args):
+    return render_slide(*args), _worker_state(args[4])
+
+def _render_carousel_task(args):
+    job, output_dir, in_memory = args
+    _, output_paths = render_carousel(*job[:6], output_dir=output_dir, phone_boxes=job[6], in_memory=in_memory)
+    return output_paths, _worker_state(job[3])
+
+
+class RenderExecutor:
+    """
+    Renders slides serially or in a pool of worker processes.
+
+    mode "slide" sends each slide to a worker, mode "carousel" sends whole
+    carousels. Results always come back in submission order, so slide paths
+    stay slide1..slideN. Worker processes live for the whole run so their
+    font cache stays warm between carousels.
+    """
+
+    def __init__(self, workers=1, mode="slide", font_paths=()):
+        if mode not in ("slide", "carousel"):
+            raise ValueError(f"Unknown render mode: {mode}")
+        self.workers = max(1, int(workers or 1))
+        self.mode = mode
+        self.font_paths = tuple(p for p in font_paths if p)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # Latest sprite cache usage reported by each worker process, by pid
+        self._sprite_usage = {}
+
+    @classmethod
+    def from_config(cls, config, font_paths=()):
+        return cls(
+            workers=config.get("render_workers", 1),
+            mode=config.get("render_parallelism", "slide"),
+            font_paths=font_paths,
+        )
+
+    def warm_fonts(self, font_paths):
+        """Fonts worker processes load at startup; takes effect for pools started afterwards."""
+        self.font_paths = tuple(p for p in font_paths if p)
+
+    def _collect(self, results):
+        """Unpack (result, worker state) pairs, merging worker timings into this process."""
+        collected = []
+        for result, (drained, (pid, usage)) in results:
+            METRICS.merge(drained)
+            self._sprite_usage[pid] = usage
+            collected.append(result)
+        return collected
+
+    def sprite_cache_usage(self, config=None):
+        """One sprite_cache_usage() dict per process that renders: the workers, or this process when serial."""
+        if not self.parallel:
+            return [sprite_cache_usage(config)]
+        return list(self._sprite_usage.values())
+
+    @property
+    def parallel(self):
+        return self.workers > 1
+
+    def start(self):
+        """
+        Start the worker pool now (no-op when serial).
+
+        Call this before any other threads run: forked workers inherit every lock
+        held at fork time (metrics, stdout, HTTP clients) and could hang on one.
+        """
+        if self.parallel:
+            # Workers are forked on the first submit, not when the executor is created
+            self._get_pool().submit(_noop).result()
+
+    def _get_pool(self):
+        # Pipeline stages may render from several threads at once
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_warm_worker,
+                    initargs=(self.font_paths,),
+                )
+            return self._pool
+
+    def render_slides(self, layout, image_paths, font_path, config, font_colors, slide_texts, output_dir, phone_boxes=None):
+        """Render one carousel's slides into output_dir, returning paths in slide order."""
+        if phone_boxes is None:
+            phone_boxes = [None] * len(image_paths)
+        tasks = [
+            (i, layout, image_path, font_path, config, font_colors, slide_texts, output_dir, phone_info)
+            for i, (image_path, phone_info) in enumerate(zip(image_paths, phone_boxes))
+        ]
+        if not self.parallel:
+            return [render_slide(*task) for task in tasks]
+        return self._collect(self._get_pool().map(_render_slide_task, tasks))
+
+    def render_carousels(self, jobs, in_memory=False):
+        """
+        Render several carousels.
+
+        jobs is a list of (layout, image_paths, font_path, config, font_colors, slide_texts, phone_boxes)
+        tuples, phone_boxes may be None. Returns one (output_dir, slide paths) pair per job, in job order.
+        With in_memory the output_dir is None and slides are JPEG bytes instead of paths.
+        """
+        output_dirs = [None if in_memory else make_output_dir() for _ in jobs]
+
+        if not self.parallel:
+            return [
+                render_carousel(*job[:6], output_dir=output_dir, phone_boxes=job[6], in_memory=in_memory)
+                for job, output_dir in zip(jobs, output_dirs)
+            ]
+
+        if self.mode == "carousel":
+            tasks = [(job, output_dir, in_memory) for job, output_dir in zip(jobs, output_dirs)]
+            results = self._collect(self._get_pool().map(_render_carousel_task, tasks))
+            return list(zip(output_dirs, results))
+
+        # Slide mode: flatten every slide of every carousel into one batch
+        tasks = []
+        for job, output_dir in zip(jobs, output_dirs):
+            layout, image_paths, font_path, config, font_colors, slide_texts, phone_boxes = job
+            if phone_boxes is None:
+                phone_boxes = [None] * len(image_paths)
+            for i, (image_path, phone_info) in enumerate(zip(image_paths, phone_boxes)):
+                tasks.append((i, layout, image_path, font_path, config, font_colors, slide_texts, output_dir, phone_info))
+        flat = iter(self._collect(self._get_pool().map(_render_slide_task, tasks)))
+        return [(output_dir, [next(flat) for _ in job[1]]) for job, output_dir in zip(jobs, output_dirs)]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
@@ -0,0 +1,236 @@
+import json
+from functools import lru_cache
+from modules.font_cache import get_font
+from modules.glow_text import render_text_sprite, composite_sprite
+from modules.metrics import METRICS
+from modules.text_layout import fit_text
+from modules.utils import BytesLRU
+
+# Pixels between drawn lines, on top of the font's line height
+LINE_GAP = 20
+GLOW_COLOR = "#FF4EDB"
+GLOW_RADIUS = 10
+BLUR_RADIUS = 8
+
+# Compiled layouts kept per process, keyed by (text, font, start size, safe box)
+PLAN_CACHE_SIZE = 1024
+
+# A glowing four-line block is roughly 900x500 RGBA (~2 MB), so the default holds about 30
+SPRITE_CACHE_MB = 64
+
+_sprite_cache = None
+
+
+class RenderPlan:
+    """
+    Everything needed to draw one slide's text, independent of the background.
+
+    lines holds (x, y, text) with y relative to the top of the text block; top
+    places the block on the slide. A plan is plain data: it round-trips through
+    to_dict / to_json, and placed() / styled() return adjusted copies so a
+    cached plan can be reused for any background or colour.
+    """
+
+    def __init__(self, font_path, font_size, lines, line_height, total_height, block_width, block_height,
+                 top=0, fill=(255, 255, 255, 255), glow_color=GLOW_COLOR, glow_radius=GLOW_RADIUS,
+                 blur_radius=BLUR_RADIUS, fitted=True):
+        self.font_path = font_path
+        self.font_size = font_size
+        self.lines = [tuple(line) for line in lines]
+        self.line_height = line_height
+        # Height as measured while fitting (line_height + 10 per line), used for centring
+        self.total_height = total_height
+        # Extent of the lines as drawn (line_height + LINE_GAP per line)
+        self.block_width = block_width
+        self.block_height = block_height
+        self.top = top
+        self.fill = tuple(fill)
+        self.glow_color = glow_color
+        self.glow_radius = glow_radius
+        self.blur_radius = blur_radius
+        self.fitted = fitted
+
+    @property
+    def font(self):
+        return get_font(self.font_path, self.font_size)
+
+    def positioned_lines(self):
+        """[((x, y), text), ...] in slide coordinates, as draw_soft_glow_lines expects."""
+        return [((x, self.top + y), text) for x, y, text in self.lines]
+
+    def placed(self, top):
+        plan = self.copy()
+        plan.top = top
+        return plan
+
+    def styled(self, fill=None, glow_color=None):
+        plan = self.copy()
+        if fill is not None:
+            plan.fill = tuple(fill)
+        if glow_color is not None:
+            plan.glow_color = glow_color
+        return plan
+
+    def scaled(self, factor):
+        """
+        Copy for a slide rendered at factor times the size (previews).
+
+        Line breaks stay exactly as compiled at full size; the font, positions,
+        margins and glow are scaled.
+        """
+        plan = self.copy()
+        plan.font_size = max(1, round(self.font_size * factor))
+        plan.lines = [(round(x * factor), round(y * factor), text) for x, y, text in self.lines]
+        plan.line_height = round(self.line_height * factor)
+        plan.total_height = round(self.total_height * factor)
+        plan.block_width = round(self.block_width * factor)
+        plan.block_height = round(self.block_height * factor)
+        plan.top = round(self.top * factor)
+        plan.glow_radius = max(1, round(self.glow_radius * factor))
+        plan.blur_radius = self.blur_radius * factor
+        return plan
+
+    def sprite_key(self):
+        """Everything the text+glow sprite depends on; the block's top is not part of it."""
+        return (self.font_path, self.font_size, tuple(self.lines), self.fill,
+                self.glow_color, self.glow_radius, self.blur_radius)
+
+    def copy(self):
+        return RenderPlan.from_dict(self.to_dict())
+
+    def to_dict(self):
+        return {
+            "font_path": self.font_path,
+            "font_size": self.font_size,
+            "lines": [list(line) for line in self.lines],
+            "line_height": self.line_height,
+            "total_height": self.total_height,
+            "block_width": self.block_width,
+            "block_height": self.block_height,
+            "top": self.top,
+            "fill": list(self.fill),
+            "glow_color": self.glow_color,
+            "glow_radius": self.glow_radius,
+            "blur_radius": self.blur_radius,
+            "fitted": self.fitted,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _compile(text, font_path, start_size, safe_box):
+    safe_left, safe_top, safe_right, safe_bottom = safe_box
+    max_width = safe_right - safe_left
+    font_size, font, lines, line_height, total_height, fitted = fit_text(
+        text, font_path, start_size, max_width, safe_bottom - safe_top
+    )
+
+    planned = []
+    for k, line in enumerate(lines):
+        bbox = font.getbbox(line)
+        x = safe_left + (max_width - (bbox[2] - bbox[0])) // 2
+        # Quotes are stripped after measuring, as the renderer always did
+        planned.append((x, k * (line_height + LINE_GAP), line.replace('"', '').replace("'", "")))
+
+    return RenderPlan(
+        font_path,
+        font_size,
+        planned,
+        line_height,
+        total_height,
+        block_width=max((int(font.getlength(line)) for line in lines), default=0),
+        block_height=len(lines) * (line_height + LINE_GAP) - LINE_GAP,
+        fitted=fitted,
+    )
+
+def compile_plan(text, font_path, start_size, safe_box):
+    """
+    Fit, wrap and position text inside safe_box, without touching any image.
+
+    Cached by (text, font, start size, safe box); returns a fresh copy so callers
+    may place and style it freely. The block top is 0 until placed().
+    """
+    return _compile(text, font_path, start_size, tuple(safe_box)).copy()
+
+def get_sprite_cache(config=None):
+    """Per-process cache of text+glow sprites, sized from glow_sprite_cache_mb on first use."""
+    global _sprite_cache
+    if _sprite_cache is None:
+        max_mb = (config or {}).get("glow_sprite_cache_mb", SPRITE_CACHE_MB)
+        _sprite_cache = BytesLRU(int(max_mb) * 1024 ** 2)
+    return _sprite_cache
+
+def plan_sprite(plan, config=None):
+    """
+    The plan's glow + text as (sprite, (left, top)) relative to the block top.
+
+    Sprites do not depend on the background or the vertical placement, so the
+    same hook on another background or account is a cache hit.
+    """
+    cache = get_sprite_cache(config)
+    key = plan.sprite_key()
+    entry = cache.get(key)
+    if entry is not None:
+        METRICS.incr("glow_sprite_hits")
+        return entry
+    METRICS.incr("glow_sprite_misses")
+    sprite, offset = render_text_sprite(
+        [((x, y), text) for x, y, text in plan.lines if text],
+        plan.font,
+        fill=plan.fill,
+        glow_color=plan.glow_color,
+        glow_radius=plan.glow_radius,
+        blur_radius=plan.blur_radius,
+    )
+    entry = (sprite, offset)
+    cache.put(key, entry, sprite.width * sprite.height * 4)
+    return entry
+
+def rasterize(plan, background, config=None):
+    """Composite plan onto a copy of background (any mode) and return the RGBA result."""
+    img = background.convert("RGBA") if background.mode != "RGBA" else background.copy()
+    if not any(text for _, _, text in plan.lines):
+        return img
+    sprite, (left, top) = plan_sprite(plan, config)
+    return composite_sprite(img, sprite, (left, plan.top + top))
+
+def plan_cache_info():
+    return _compile.cache_info()
+
+def clear_plan_cache():
+    _compile.cache_clear()
+
+def sprite_cache_usage(config=None):
+    """This process' sprite cache occupancy, as render workers report it back to the parent."""
+    cache = get_sprite_cache(config)
+    return {"sprites": len(cache), "bytes": cache.current_bytes, "max_bytes": cache.max_bytes, "evictions": cache.evictions}
+
+def sprite_cache_info(config=None, usage=None):
+    """
+    Hit rate from the run's counters (all render processes) and cache occupancy.
+
+    usage is a list of sprite_cache_usage() dicts, one per render process; by
+    default only this process' cache is reported.
+    """
+    counters = METRICS.counters
+    hits, misses = counters.get("glow_sprite_hits", 0), counters.get("glow_sprite_misses", 0)
+    rate = hits / (hits + misses) if hits + misses else 0.0
+    if not usage:
+        usage = [sprite_cache_usage(config)]
+    used = sum(u["bytes"] for u in usage)
+    budget = sum(u["max_bytes"] for u in usage)
+    return (
+        f"Glow sprite cache: {hits} hits, {misses} misses ({rate:.0%} hit rate), "
+        f"{sum(u['sprites'] for u in usage)} sprites, {used / 1024 ** 2:.1f}/{budget / 1024 ** 2:.0f} MB, "
+        f"{sum(u['evictions'] for u in usage)} evictions across {len(usage)} render process(es)"
+    )
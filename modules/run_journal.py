@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+RUN_JOURNAL_PATH = "cache/run_journal.sqlite3"
+
+# Stages a (row, variation) passes through, in order. Variation 0 holds the row's generated texts.
+TEXTS = "texts"
+RENDERED = "rendered"
+FOLDER = "folder"
+UPLOADED = "uploaded"
+RECORDED = "recorded"
+STAGES = (TEXTS, RENDERED, FOLDER, UPLOADED, RECORDED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sheet_id TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS items (
+    run_id INTEGER NOT NULL,
+    row_index INTEGER NOT NULL,
+    variation INTEGER NOT NULL,
+    row_hash TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    data TEXT NOT NULL DEFAULT '{}',
+    error TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, row_index, variation)
+);
+"""
+
+
+def row_hash(row):
+    """Fingerprint of a sheet row, so edited rows are generated again instead of resumed."""
+    return hashlib.sha256(json.dumps([cell.strip() for cell in row]).encode("utf-8")).hexdigest()[:16]
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class RunJournal:
+    """
+    SQLite journal of a run's progress per (sheet row, variation).
+
+    Every stage that finishes is written straight away together with the IDs
+    it produced: generated texts, the carousel ID and Drive folder, the
+    uploaded file IDs. A restarted run picks up the latest unfinished run for
+    the sheet. It skips finished items and continues the rest from the last
+    stage recorded for them.
+    """
+
+    def __init__(self, path=RUN_JOURNAL_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self.run_id = None
+
+    def start_run(self, sheet_id, new=False):
+        """Resume the latest unfinished run for sheet_id, or start one. Returns (run_id, resumed)."""
+        with self._lock:
+            row = None if new else self._conn.execute(
+                "SELECT run_id FROM runs WHERE sheet_id = ? AND finished_at IS NULL ORDER BY run_id DESC LIMIT 1",
+                (sheet_id,),
+            ).fetchone()
+            if row is not None:
+                self.run_id = row[0]
+                return self.run_id, True
+            cursor = self._conn.execute(
+                "INSERT INTO runs (sheet_id, started_at) VALUES (?, ?)", (sheet_id, _now())
+            )
+            self.run_id = cursor.lastrowid
+            return self.run_id, False
+
+    def finish_run(self):
+        with self._lock:
+            self._conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (_now(), self.run_id))
+
+    def get(self, row_index, variation, row_hash):
+        """(stage, data) recorded for this item, or None if it has not started or its row has changed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stage, data, row_hash FROM items WHERE run_id = ? AND row_index = ? AND variation = ?",
+                (self.run_id, row_index, variation),
+            ).fetchone()
+        if row is None or row[2] != row_hash:
+            return None
+        return row[0], json.loads(row[1])
+
+    def mark(self, row_index, variation, row_hash, stage, **data):
+        """Record that an item finished stage; data is merged into what earlier stages stored."""
+        previous = self.get(row_index, variation, row_hash)
+        merged = dict(previous[1]) if previous else {}
+        merged.update(data)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO items (run_id, row_index, variation, row_hash, stage, data, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, NULL, ?)",
+                (self.run_id, row_index, variation, row_hash, stage, json.dumps(merged), _now()),
+            )
+
+    def mark_slide(self, row_index, variation, name, file_id):
+        """
+        Add one uploaded slide's Drive file ID to the item's data, keeping its stage.
+
+        Called from upload threads as each slide lands, so a resumed FOLDER item
+        only uploads the slides that are still missing from its Drive folder.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM items WHERE run_id = ? AND row_index = ? AND variation = ?",
+                (self.run_id, row_index, variation),
+            ).fetchone()
+            if row is None:
+                return
+            data = json.loads(row[0])
+            data.setdefault("uploaded_slides", {})[name] = file_id
+            self._conn.execute(
+                "UPDATE items SET data = ?, updated_at = ? WHERE run_id = ? AND row_index = ? AND variation = ?",
+                (json.dumps(data), _now(), self.run_id, row_index, variation),
+            )
+
+    def mark_error(self, row_index, variation, error):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE items SET error = ?, updated_at = ? WHERE run_id = ? AND row_index = ? AND variation = ?",
+                (str(error), _now(), self.run_id, row_index, variation),
+            )
+
+    def status(self, run_id=None) -> str:
+        with self._lock:
+            if run_id is None:
+                row = self._conn.execute("SELECT run_id FROM runs ORDER BY run_id DESC LIMIT 1").fetchone()
+                if row is None:
+                    return "No runs recorded yet"
+                run_id = row[0]
+            run = self._conn.execute(
+                "SELECT sheet_id, started_at, finished_at FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if run is None:
+                return f"No run {run_id}"
+            items = self._conn.execute(
+                "SELECT row_index, variation, stage, data, error FROM items WHERE run_id = ? AND variation > 0 "
+                "ORDER BY row_index, variation",
+                (run_id,),
+            ).fetchall()
+            rows_with_texts = self._conn.execute(
+                "SELECT COUNT(*) FROM items WHERE run_id = ? AND variation = 0", (run_id,)
+            ).fetchone()[0]
+
+        sheet_id, started_at, finished_at = run
+        counts = {stage: 0 for stage in STAGES[1:]}
+        lines = [
+            f"Run {run_id} on sheet {sheet_id}: started {started_at}, "
+            + (f"finished {finished_at}" if finished_at else "unfinished"),
+            f"Rows with generated texts: {rows_with_texts}",
+        ]
+        for row_index, variation, stage, data, error in items:
+            counts[stage] += 1
+            data = json.loads(data)
+            line = f"  row {row_index} variation {variation}: {stage}"
+            if data.get("carousel_id"):
+                line += f" (ID {data['carousel_id']}, folder {data.get('folder_id')})"
+            if error:
+                line += f" ❌ {error}"
+            lines.append(line)
+        lines.insert(2, "Variations by last completed stage: " + ", ".join(f"{s} {n}" for s, n in counts.items()))
+        return "\n".join(lines)
+
+    def close(self):
+        self._conn.close()
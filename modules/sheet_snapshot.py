@@ -0,0 +1,64 @@
+import threading
+import time
+from modules.google_clients import get_sheets_service
+from modules.metrics import METRICS
+
+PROMPT_CELLS = ('Prompts!A2', 'Prompts!C2', 'Prompts!E2', 'Prompts!G2')
+
+
+class SheetSnapshot:
+    """
+    In-memory copy of the slide text rows and the prompt cells.
+
+    Everything is read with a single values.batchGet. With refresh_interval
+    set, maybe_refresh() reloads once that many seconds have passed, so long
+    runs can pick up prompt edits.
+    """
+
+    def __init__(self, spreadsheet_id, data_range='Sheet1', prompt_cells=PROMPT_CELLS, refresh_interval=None):
+        self.spreadsheet_id = spreadsheet_id
+        self.data_range = data_range
+        self.prompt_cells = tuple(prompt_cells)
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self.rows = []
+        self.prompts = {}
+        self.loaded_at = None
+        self.reads = 0
+
+    def load(self):
+        service = get_sheets_service()
+        with METRICS.timer("sheet_read"):
+            result = service.spreadsheets().values().batchGet(
+                spreadsheetId=self.spreadsheet_id,
+                ranges=[self.data_range] + list(self.prompt_cells)
+            ).execute()
+        value_ranges = result.get('valueRanges', [])
+
+        data = value_ranges[0].get('values', []) if value_ranges else []
+        prompts = {}
+        for cell, value_range in zip(self.prompt_cells, value_ranges[1:]):
+            values = value_range.get('values', [])
+            prompts[cell] = values[0][0] if values and values[0] else None
+
+        with self._lock:
+            # Return all rows except the header
+            self.rows = data[1:] if data else []
+            self.prompts = prompts
+            self.loaded_at = time.monotonic()
+            self.reads += 1
+        print(f"📄 Sheet snapshot loaded: {len(self.rows)} rows, {len(prompts)} prompt cells")
+        return self
+
+    def maybe_refresh(self):
+        if self.loaded_at is None:
+            return self.load()
+        if self.refresh_interval and time.monotonic() - self.loaded_at >= self.refresh_interval:
+            return self.load()
+        return self
+
+    def prompt(self, cell):
+        value = self.prompts.get(cell)
+        if not value:
+            raise ValueError(f"❌ Prompt cell {cell} is empty or missing.")
+        return value
@@ -1,11 +1,7 @@
-from googleapiclient.discovery import build
-from google.oauth2.service_account import Credentials
-
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
+from modules.google_clients import get_sheets_service
 
 def get_sheet_data(sheet_id, sheet_range):
-    creds = Credentials.from_service_account_file('credentials.json', scopes=SCOPES)
-    service = build('sheets', 'v4', credentials=creds)
+    service = get_sheets_service()
     sheet = service.spreadsheets()
     result = sheet.values().get(spreadsheetId=sheet_id, range=sheet_range).execute()
     return result.get('values', [])
@@ -0,0 +1,103 @@
+from functools import lru_cache
+from modules.font_cache import get_font
+
+MIN_FONT_SIZE = 60
+SIZE_STEP = 2
+LINE_SPACING = 10
+
+# Word advances are measured once at this size and scaled to the size being tried
+REFERENCE_SIZE = 100
+
+
+@lru_cache(maxsize=8192)
+def _reference_width(font_path, word):
+    return get_font(font_path, REFERENCE_SIZE).getlength(word)
+
+def _ink_width(font, line):
+    bbox = font.getbbox(line)
+    return bbox[2] - bbox[0]
+
+def wrap_text(text, font_path, font_size, max_width):
+    """
+    Greedy word wrap by pixel width, same breaks as measuring every prefix.
+
+    Prefix widths are estimated from cached word advances; only prefixes whose
+    estimate lands close to max_width are measured exactly.
+    """
+    font = get_font(font_path, font_size)
+    scale = font_size / REFERENCE_SIZE
+    space = _reference_width(font_path, " ") * scale
+
+    lines = []
+    current_line = ""
+    current_estimate = 0.0
+    for word in text.split():
+        word_estimate = _reference_width(font_path, word) * scale
+        if current_line:
+            test_line = current_line + " " + word
+            estimate = current_estimate + space + word_estimate
+        else:
+            test_line = word
+            estimate = word_estimate
+
+        # Side bearings and per-glyph hinting keep the ink width within this of the estimate
+        slack = font_size * 0.25 + len(test_line) * 0.6
+        if estimate + slack < max_width:
+            fits = True
+        elif estimate - slack > max_width:
+            fits = False
+        else:
+            fits = _ink_width(font, test_line) <= max_width
+
+        if fits:
+            current_line = test_line
+            current_estimate = estimate
+        else:
+            lines.append(current_line)
+            current_line = word
+            current_estimate = word_estimate
+    if current_line:
+        lines.append(current_line)
+    return lines
+
+def measure_layout(text, font_path, font_size, max_width, line_spacing=LINE_SPACING):
+    font = get_font(font_path, font_size)
+    lines = wrap_text(text, font_path, font_size, max_width)
+    line_height = font.getbbox("Ay")[3] - font.getbbox("Ay")[1]
+    total_height = len(lines) * (line_height + line_spacing)
+    return lines, line_height, total_height
+
+def fit_text(text, font_path, start_size, max_width, max_height, min_size=MIN_FONT_SIZE, line_spacing=LINE_SPACING):
+    """
+    Find the largest size on the start_size, start_size - 2, ... ladder whose wrapped text fits max_height.
+
+    Binary search over the ladder the old shrink loop walked one step at a time.
+    Returns (font_size, font, lines, line_height, total_height, fitted). When nothing
+    fits, the font is clamped to min_size but the lines and heights come from the
+    last ladder step, as before.
+    """
+    last = 0
+    while start_size - last * SIZE_STEP > min_size:
+        last += 1
+
+    measured = {}
+
+    def attempt(step):
+        if step not in measured:
+            measured[step] = measure_layout(text, font_path, start_size - step * SIZE_STEP, max_width, line_spacing)
+        return measured[step][2] <= max_height
+
+    lo, hi = 0, last
+    if not attempt(hi):
+        lines, line_height, total_height = measured[hi]
+        return min_size, get_font(font_path, min_size), lines, line_height, total_height, False
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if attempt(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+
+    font_size = start_size - lo * SIZE_STEP
+    lines, line_height, total_height = measured[lo]
+    return font_size, get_font(font_path, font_size), lines, line_height, total_height, True
@@ -0,0 +1,185 @@
+import io
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload
+from modules.google_clients import get_drive_service
+from modules.metrics import METRICS
+
+# Map file extensions to MIME types
+EXT_TO_MIME = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.bmp': 'image/bmp',
+    '.tiff': 'image/tiff',
+    '.webp': 'image/webp',
+}
+# Files at least this big go up in resumable chunks, smaller ones in a single request
+RESUMABLE_THRESHOLD = 5 * 1024 ** 2
+CHUNK_SIZE = 4 * 1024 ** 2  # must be a multiple of 256 KB
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+def mime_type_for(path):
+    return EXT_TO_MIME.get(os.path.splitext(path)[1].lower(), 'application/octet-stream')
+
+def _is_retryable(error):
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUSES
+    return isinstance(error, (OSError, TimeoutError))
+
+
+class UploadEngine:
+    """
+    Uploads files to a Drive folder, several at a time.
+
+    Large files use resumable uploads so a failed chunk is retried from the
+    last acknowledged byte instead of from scratch. Transient errors (5xx,
+    429, dropped connections) are retried with exponential backoff and
+    jitter. Results come back in the order the paths were given.
+    """
+
+    def __init__(self, max_workers=4, max_retries=5, backoff_seconds=1.0):
+        self.max_workers = max(1, int(max_workers or 1))
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._pool = None
+        self._lock = threading.Lock()
+        self.files_uploaded = 0
+        self.bytes_uploaded = 0
+        self.retries = 0
+        self.failures = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            max_workers=config.get("upload_concurrency", 4),
+            max_retries=config.get("upload_retries", 5),
+        )
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="upload")
+            return self._pool
+
+    def _backoff(self, attempt, name, error):
+        with self._lock:
+            self.retries += 1
+        delay = self.backoff_seconds * (2 ** attempt) + random.uniform(0, self.backoff_seconds)
+        print(f"🔁 Retrying {name} in {delay:.1f}s ({error})")
+        time.sleep(delay)
+
+    def upload_stream(self, fh, name, folder_id, mime_type, size):
+        """Upload an open binary stream as name into folder_id and return the new file ID."""
+        drive_service = get_drive_service()
+        resumable = size >= RESUMABLE_THRESHOLD
+        media = MediaIoBaseUpload(fh, mimetype=mime_type, chunksize=CHUNK_SIZE, resumable=resumable)
+        request = drive_service.files().create(
+            body={"name": name, "parents": [folder_id]},
+            media_body=media,
+            fields="id, name",
+            supportsAllDrives=True  # ✅ Required for Shared Drives
+        )
+
+        attempt = 0
+        response = None
+        start = time.perf_counter()
+        while response is None:
+            try:
+                if resumable:
+                    _, response = request.next_chunk()
+                else:
+                    response = request.execute()
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                if not resumable:
+                    fh.seek(0)
+                self._backoff(attempt, name, e)
+                attempt += 1
+
+        METRICS.observe("upload", time.perf_counter() - start, file=name, retries=attempt)
+        METRICS.incr("upload_bytes", size)
+        with self._lock:
+            self.files_uploaded += 1
+            self.bytes_uploaded += size
+        return response["id"]
+
+    def upload_file(self, file_path, folder_id):
+        filename = os.path.basename(file_path)
+        with open(file_path, "rb") as fh:
+            file_id = self.upload_stream(fh, filename, folder_id, mime_type_for(file_path), os.path.getsize(file_path))
+        print(f"📤 Uploaded {filename} to Drive folder {folder_id}")
+        return file_id
+
+    def upload_bytes(self, data, name, folder_id):
+        """Upload an in-memory file (e.g. an encoded slide) without touching the disk."""
+        with io.BytesIO(data) as fh:
+            file_id = self.upload_stream(fh, name, folder_id, mime_type_for(name), len(data))
+        print(f"📤 Uploaded {name} to Drive folder {folder_id} from memory")
+        return file_id
+
+    def _try_upload(self, upload, name, *args):
+        try:
+            return upload(*args)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            print(f"❌ Failed to upload {name}: {e}")
+            return None
+
+    def _map(self, fn, items):
+        if self.max_workers == 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        return list(self._get_pool().map(fn, items))
+
+    def _try_upload_and_report(self, on_uploaded, upload, name, *args):
+        file_id = self._try_upload(upload, name, *args)
+        if file_id is not None and on_uploaded is not None:
+            on_uploaded(name, file_id)
+        return file_id
+
+    def upload_files(self, folder_id, file_paths, on_uploaded=None):
+        """
+        Upload file_paths in parallel. Returns file IDs in the same order, None where an upload failed.
+
+        on_uploaded(name, file_id) is called from the upload thread as each file completes.
+        """
+        return self._map(
+            lambda p: self._try_upload_and_report(on_uploaded, self.upload_file, os.path.basename(p), p, folder_id),
+            list(file_paths),
+        )
+
+    def upload_buffers(self, folder_id, buffers, on_uploaded=None):
+        """Upload (name, bytes) pairs in parallel. Returns file IDs in the same order, None where an upload failed."""
+        return self._map(
+            lambda item: self._try_upload_and_report(on_uploaded, self.upload_bytes, item[0], item[1], item[0], folder_id),
+            list(buffers),
+        )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def summary(self) -> str:
+        return (
+            f"Files uploaded: {self.files_uploaded} ({self.bytes_uploaded / 1024 ** 2:.1f} MB)\n"
+            f"Retries: {self.retries}, failures: {self.failures}"
+        )
+
+
+_default_engine = None
+
+def get_upload_engine():
+    """Process-wide engine with default settings, for callers without a config."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = UploadEngine()
+    return _default_engine